@@ -1,21 +1,37 @@
+import re
 import uuid
 import shutil
 import os
 import json
 import subprocess
 import sys # Added for sys.executable
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from fastapi import FastAPI, Form, Request, HTTPException, UploadFile, File
-from fastapi.responses import JSONResponse, FileResponse, HTMLResponse
+from fastapi.responses import JSONResponse, FileResponse, HTMLResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from pathlib import Path
 from dotenv import load_dotenv # Import load_dotenv
 
+from pipeline.compression import compression_of, strip_compression_extension, open_text
+
 # Load environment variables from .env file at application startup
 # This ensures GOOGLE_API_KEY is available in os.environ for batch_runner.py
 load_dotenv() 
 
+# Script that processes a submitted request in the background. Overridable, e.g. with the
+# stub backend of load_test.py, to measure request handling without running real batches.
+BATCH_RUNNER_SCRIPT = os.environ.get("PIPELINE_BATCH_RUNNER", "batch_runner.py")
+# Straggler handling of the batch runner: a deadline per batch, and speculative copies of slow batches
+BATCH_RUNNER_OPTIONS = []
+if os.environ.get("PIPELINE_BATCH_TIMEOUT"):
+    BATCH_RUNNER_OPTIONS += ["--batch-timeout", os.environ["PIPELINE_BATCH_TIMEOUT"]]
+if os.environ.get("PIPELINE_SPECULATIVE", "").lower() in ("1", "true", "yes"):
+    BATCH_RUNNER_OPTIONS.append("--speculative")
+# Compression of batch files and results: "gzip" or "zstd"
+if os.environ.get("PIPELINE_COMPRESSION"):
+    BATCH_RUNNER_OPTIONS += ["--compression", os.environ["PIPELINE_COMPRESSION"]]
+
 app = FastAPI(title="FSM-Based Scalable Pipeline API")
 
 # Allow frontend requests (adjust origins if needed)
@@ -153,12 +169,13 @@ async def submit_pipeline(
         # We are now passing the dynamic_pipeline_def_path directly
         subprocess.Popen([
             sys.executable, # Use the current python interpreter
-            "batch_runner.py", # Assuming batch_runner.py is in the same directory as main.py
+            BATCH_RUNNER_SCRIPT, # batch_runner.py unless PIPELINE_BATCH_RUNNER is set
             request_id,
             str(batch_size),
             dynamic_pipeline_def_path, # Path to the dynamic pipeline definition
             dataset_path,              # Path to the dataset
-            script_dir                 # Path to the scripts directory
+            script_dir,                # Path to the scripts directory
+            *BATCH_RUNNER_OPTIONS
         ])
 
         return {"request_id": request_id, "status": "processing_started", "message": "Pipeline files saved and batch processing initiated."}
@@ -173,8 +190,92 @@ async def submit_pipeline(
         )
 
 
+@app.post("/rerun_failed/{request_id}")
+async def rerun_failed(request_id: str):
+    """
+    Reruns only the records of a request that exhausted their retries, merging them into its existing results.
+    """
+    base_path = f"requests/{request_id}"
+    dead_letter_dir = os.path.join(base_path, "dead_letters")
+    if not os.path.isdir(dead_letter_dir) or not os.listdir(dead_letter_dir):
+        raise HTTPException(status_code=404, detail="No dead-lettered records found for this request ID.")
+
+    subprocess.Popen([
+        sys.executable,
+        BATCH_RUNNER_SCRIPT,
+        request_id,
+        "0", # Batch size is unused when rerunning; the existing batches are reused
+        os.path.join(base_path, "dynamic_pipeline_definition.json"),
+        os.path.join(base_path, "dataset.json"),
+        os.path.join(base_path, "scripts"),
+        "--rerun-dead-letters",
+        *BATCH_RUNNER_OPTIONS
+    ])
+    return {"request_id": request_id, "status": "rerun_started", "message": "Rerunning dead-lettered records."}
+
+
+def _is_result_file(fname: str) -> bool:
+    """
+    Checks whether a file in a results directory holds results: .json or .jsonl, optionally .gz or .zst compressed.
+    """
+    return strip_compression_extension(fname).endswith((".json", ".jsonl"))
+
+
+def _result_file_order(fname: str):
+    """
+    Sort key placing batch result files in batch order (batch_2 before batch_10), followed by any other files by name.
+    """
+    match = re.match(r"batch_(\d+)_", fname)
+    return (0, int(match.group(1)), fname) if match else (1, 0, fname)
+
+
+def _iter_result_file(file_path: str):
+    """
+    Yields the records of a results file, decompressing it if needed and skipping malformed JSON lines.
+    """
+    with open_text(file_path, "r") as f:
+        # If it's a JSONL file (multiple JSON objects per line)
+        if strip_compression_extension(file_path).endswith(".jsonl"):
+            for line in f:
+                if line.strip(): # Avoid empty lines
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError as e:
+                        print(f"WARNING: Malformed JSON line in {file_path}: {line.strip()} - {e}")
+                        continue # Skip malformed lines
+        else: # Assume it's a single JSON object or array
+            data = json.load(f)
+            if isinstance(data, list):
+                yield from data
+            else:
+                yield data
+
+
+def _accepted_encodings(request: Request) -> set:
+    """
+    Returns the content codings listed in the request's Accept-Encoding header, leaving out those with q=0.
+    """
+    encodings = set()
+    for item in request.headers.get("accept-encoding", "").split(","):
+        coding, _, params = item.strip().partition(";")
+        if coding and params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            encodings.add(coding.lower())
+    return encodings
+
+
 @app.get("/get_result/{request_id}")
-async def get_result(request_id: str):
+async def get_result(request_id: str, request: Request, format: str = "json", batch: Optional[int] = None):
+    """
+    Returns the results of a request, reading compressed result files transparently.
+
+    With format=json (default) the response is {"request_id": ..., "results": [...]}. With format=jsonl it is
+    one record per line (NDJSON). If a single compressed .jsonl file is selected (batch=N, or a request with one
+    batch) and the client accepts its Content-Encoding, the stored bytes are sent as they are, without
+    decompressing and recompressing them. Several files are decompressed and streamed instead: joined gzip
+    members or zstd frames are valid, but some clients (httpx among them) silently decode only the first.
+    """
+    if format not in ("json", "jsonl"):
+        raise HTTPException(status_code=400, detail=f"Unsupported format '{format}'. Expected 'json' or 'jsonl'.")
     response_dir = f"requests/{request_id}/results" # Assuming state_logs is where results are stored
 
     if not os.path.exists(response_dir) or not os.path.isdir(response_dir):
@@ -193,34 +294,35 @@ async def get_result(request_id: str):
             status_code=404, detail="Invalid request ID or results not ready."
         )
 
+    file_names = sorted((fname for fname in os.listdir(response_dir) if _is_result_file(fname)
+                         and (batch is None or fname.startswith(f"batch_{batch}_"))), key=_result_file_order)
+    file_paths = [os.path.join(response_dir, fname) for fname in file_names]
+
+    if format == "jsonl":
+        encoding = compression_of(file_names[0]) if len(file_names) == 1 else None
+        if encoding and encoding in _accepted_encodings(request) and strip_compression_extension(file_names[0]).endswith(".jsonl"):
+            # Complete result files only: compressed results are moved into place once fully written
+            return FileResponse(file_paths[0], media_type="application/x-ndjson", headers={"Content-Encoding": encoding})
+
+        def iter_lines():
+            for file_path in file_paths:
+                try:
+                    for record in _iter_result_file(file_path):
+                        yield json.dumps(record) + "\n"
+                except Exception as e:
+                    print(f"ERROR: Could not read file {file_path}: {e}")
+        return StreamingResponse(iter_lines(), media_type="application/x-ndjson")
+
     result = []
-    for fname in os.listdir(response_dir):
-        if fname.endswith(".json") or fname.endswith(".jsonl"): # Allow .jsonl if using state_tracker.py
-            file_path = os.path.join(response_dir, fname)
-            try:
-                # If it's a JSONL file (multiple JSON objects per line)
-                if fname.endswith(".jsonl"):
-                    with open(file_path, "r", encoding='utf-8') as f:
-                        for line in f:
-                            if line.strip(): # Avoid empty lines
-                                try:
-                                    result.append(json.loads(line))
-                                except json.JSONDecodeError as e:
-                                    print(f"WARNING: Malformed JSON line in {file_path}: {line.strip()} - {e}")
-                                    continue # Skip malformed lines
-                else: # Assume it's a single JSON object or array
-                    with open(file_path, "r", encoding='utf-8') as f:
-                        data = json.load(f)
-                        if isinstance(data, list):
-                            result.extend(data)
-                        else:
-                            result.append(data)
-            except json.JSONDecodeError as e:
-                print(f"WARNING: Malformed JSON file {file_path}: {e}")
-                continue  # skip malformed files silently, or log if needed
-            except Exception as e:
-                print(f"ERROR: Could not read file {file_path}: {e}")
-                continue
+    for file_path in file_paths:
+        try:
+            for record in _iter_result_file(file_path):
+                result.append(record)
+        except json.JSONDecodeError as e:
+            print(f"WARNING: Malformed JSON file {file_path}: {e}")
+            continue  # skip malformed files silently, or log if needed
+        except Exception as e:
+            print(f"ERROR: Could not read file {file_path}: {e}")
+            continue
 
     return {"request_id": request_id, "results": result}
-
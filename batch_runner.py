@@ -1,25 +1,35 @@
 import os
+import re
 import json
+import shutil
+import statistics
+import argparse
 import subprocess
 import sys
 import time
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 
-def split_dataset(dataset_path: str, batch_dir: str, batch_size: int) -> List[str]:
+from pipeline.compression import COMPRESSION_EXTENSIONS, compression_of, open_text, with_compression
+from pipeline.dead_letter import dead_letter_entry, write_dead_letters
+from pipeline.loader import load_dataset
+from pipeline.results import ResultsWriter
+
+def split_dataset(dataset_path: str, batch_dir: str, batch_size: int, compression: Optional[str] = None) -> List[str]:
     """
     Splits the dataset JSON file into smaller files of given batch_size.
     Returns list of paths to batch files.
 
     Args:
-        dataset_path (str): Path to the input dataset JSON file.
+        dataset_path (str): Path to the input dataset JSON file (optionally .gz or .zst compressed).
         batch_dir (str): Directory where the batch files will be saved.
         batch_size (int): Maximum number of records per batch file.
+        compression (Optional[str]): "gzip" or "zstd" to write compressed, compact batch files (batch_N.json.gz).
 
     Returns:
         List[str]: A list of paths to the created batch files.
     """
     try:
-        with open(dataset_path, "r", encoding='utf-8') as f:
+        with open_text(dataset_path, "r") as f:
             data = json.load(f)
     except FileNotFoundError:
         print(f"ERROR: Dataset file not found: {dataset_path}", file=sys.stderr)
@@ -37,10 +47,13 @@ def split_dataset(dataset_path: str, batch_dir: str, batch_size: int) -> List[st
 
     for i in range(0, len(data), batch_size):
         batch = data[i:i + batch_size]
-        batch_file = os.path.join(batch_dir, f"batch_{i // batch_size}.json")
+        batch_file = with_compression(os.path.join(batch_dir, f"batch_{i // batch_size}.json"), compression)
         try:
-            with open(batch_file, "w", encoding='utf-8') as bf:
-                json.dump(batch, bf, indent=2)
+            with open_text(batch_file, "w") as bf:
+                if compression:
+                    json.dump(batch, bf, separators=(",", ":")) # Indentation only costs space and time once compressed
+                else:
+                    json.dump(batch, bf, indent=2)
             batch_files.append(batch_file)
         except IOError as e:
             print(f"ERROR: Could not write batch file {batch_file}: {e}", file=sys.stderr)
@@ -48,9 +61,218 @@ def split_dataset(dataset_path: str, batch_dir: str, batch_size: int) -> List[st
 
     return batch_files
 
-def run_batches(batch_files: List[str], dynamic_pipeline_path: str, script_dir: str, request_id: str, results_output_base_path: str):
+def find_batch_files(batch_dir: str) -> List[str]:
+    """
+    Lists the batch files previously written by split_dataset, ordered by batch number.
+
+    Args:
+        batch_dir (str): Directory containing the batch files.
+
+    Returns:
+        List[str]: Paths to the batch files, where the list position equals the batch number.
+    """
+    if not os.path.isdir(batch_dir):
+        return []
+    numbered = []
+    for fname in os.listdir(batch_dir):
+        match = re.fullmatch(r"batch_(\d+)\.json(\.gz|\.zst)?", fname)
+        if match:
+            numbered.append((int(match.group(1)), os.path.join(batch_dir, fname)))
+    return [path for _, path in sorted(numbered)]
+
+# Seconds between checks of the running batch processes
+POLL_INTERVAL = 0.5
+
+class BatchAttempt:
+    """
+    One running copy of a batch: its process, the files it writes and when it started.
+    The first attempt of a batch writes to the batch's own files; speculative copies write to
+    their own directory until they win.
+    """
+    def __init__(self, index: int, number: int, process: subprocess.Popen, container_name: str, log_file: Any,
+                 output_file: str, dead_letter_file: Optional[str], manifest_file: Optional[str], work_dir: Optional[str] = None):
+        self.index = index
+        self.number = number
+        self.process = process
+        self.container_name = container_name
+        self.log_file = log_file
+        self.output_file = output_file
+        self.dead_letter_file = dead_letter_file
+        self.manifest_file = manifest_file
+        self.work_dir = work_dir # Only set for speculative copies
+        self.start_time = time.time()
+
+    def elapsed(self) -> float:
+        """
+        Returns the seconds since this copy was started.
+        """
+        return time.time() - self.start_time
+
+def build_batch_command(batch_file: str, output_file: str, dynamic_pipeline_path: str, script_dir: str,
+                        container_name: str, google_api_key: str, dead_letter_file: Optional[str] = None,
+                        rerun_dead_letters: bool = False, manifest_file: Optional[str] = None,
+                        resume_from: Optional[str] = None, rate_limit_share: float = 1.0) -> List[str]:
+    """
+    Builds the Docker command that runs pipeline/engine.py on one batch.
+
+    Args:
+        batch_file (str): Path to the batch dataset.
+        output_file (str): Path of the batch's results file, also used as its state log.
+        dynamic_pipeline_path (str): Path to the pipeline definition.
+        script_dir (str): Directory containing all transformation scripts.
+        container_name (str): Name given to the container, so it can be killed on timeout.
+        google_api_key (str): API key passed to the container.
+        dead_letter_file (Optional[str]): Path of the batch's dead-letter file.
+        rerun_dead_letters (bool): If True, only the dead-lettered records are rerun.
+        manifest_file (Optional[str]): Path of the batch's run manifest.
+        resume_from (Optional[str]): Step name or position to resume from.
+        rate_limit_share (float): Fraction of the pipeline's rate limits this container may use.
+
+    Returns:
+        List[str]: The command.
+    """
+    # IMPORTANT: /app/pipeline/engine.py is the path *inside* the Docker container
+    # The host paths need to be mapped using -v
+    cmd = [
+        "docker", "run", "--rm", # --rm removes the container after it exits
+        "--name", container_name, # Named so a timed-out or superseded batch can be killed
+        "-v", f"{os.getcwd()}:/app", # Mount current working directory to /app inside container
+        "-e", f"GOOGLE_API_KEY={google_api_key}", # Pass the GOOGLE_API_KEY to the container
+        "-e", f"STATE_LOG_PATH=/app/{output_file}", # Pass the specific output file path for state_tracker
+        "-e", f"RATE_LIMIT_SHARE={rate_limit_share}", # Containers run side by side, so each gets its part of the rate limits
+        "data-pipeline:latest", # The name of your Docker image
+        "python", "pipeline/engine.py", # Command to run inside container
+        f"/app/{dynamic_pipeline_path}", # Path to pipeline definition inside container
+        f"/app/{batch_file}",            # Path to batch dataset inside container
+        f"/app/{output_file}",           # Path for output file inside container (should match STATE_LOG_PATH usage)
+        f"/app/{script_dir}"             # Path to scripts directory inside container
+    ]
+    if dead_letter_file:
+        cmd += ["--dead-letter-path", f"/app/{dead_letter_file}"]
+    if rerun_dead_letters:
+        cmd.append("--rerun-dead-letters")
+    if manifest_file:
+        cmd += ["--manifest-path", f"/app/{manifest_file}"]
+    if resume_from is not None:
+        cmd += ["--resume-from", resume_from]
+    return cmd
+
+def kill_container(container_name: str):
+    """
+    Kills a batch container. Killing the 'docker run' client alone would leave the container running.
+
+    Args:
+        container_name (str): The name given with 'docker run --name'.
+    """
+    try:
+        subprocess.run(["docker", "kill", container_name], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=30)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        print(f"WARNING: Could not kill container {container_name}: {e}", file=sys.stderr)
+
+def stop_attempt(attempt: BatchAttempt):
+    """
+    Stops a batch attempt that is still running, waiting until its container no longer writes any files.
+    """
+    if attempt.process.poll() is None:
+        kill_container(attempt.container_name)
+        attempt.process.kill()
+        attempt.process.wait()
+    attempt.log_file.close()
+
+def print_attempt_log(attempt: BatchAttempt):
+    """
+    Prints the combined stdout and stderr of a batch attempt to stderr.
+    """
+    with open(attempt.log_file.name, "r", encoding='utf-8', errors='replace') as f:
+        print("--- OUTPUT ---", file=sys.stderr)
+        print(f.read(), file=sys.stderr)
+
+def promote_attempt(attempt: BatchAttempt, output_file: str, dead_letter_file: Optional[str], manifest_file: Optional[str]):
+    """
+    Moves the files of a winning speculative copy over the batch's own files.
+    """
+    os.replace(attempt.output_file, output_file)
+    if os.path.exists(f"{output_file}.partial"):
+        os.remove(f"{output_file}.partial") # Compressed output the superseded copy had not finished
+    if dead_letter_file:
+        if attempt.dead_letter_file and os.path.exists(attempt.dead_letter_file):
+            os.replace(attempt.dead_letter_file, dead_letter_file)
+        elif os.path.exists(dead_letter_file):
+            os.remove(dead_letter_file) # Left by the superseded copy
+    if manifest_file and attempt.manifest_file and os.path.exists(attempt.manifest_file):
+        os.replace(attempt.manifest_file, manifest_file)
+
+def read_finished_results(results_path: str) -> List[Dict[str, Any]]:
+    """
+    Reads the complete records of a results file a killed engine left behind, stopping at the first
+    truncated line or compressed block.
+
+    Args:
+        results_path (str): Path to the JSONL results file, possibly compressed.
+
+    Returns:
+        List[Dict[str, Any]]: The state histories written before the engine was killed, in batch order.
+    """
+    results = []
+    if not os.path.exists(results_path):
+        return results
+    try:
+        with open_text(results_path, "r") as f:
+            for line in f:
+                if not line.endswith("\n"):
+                    break # Cut off mid-write
+                results.append(json.loads(line))
+    except (EOFError, OSError, ValueError):
+        pass # Truncated compressed stream or line; everything before it is complete
+    return results
+
+def dead_letter_timed_out_batch(batch_file: str, output_file: str, dead_letter_file: Optional[str], batch_timeout: float) -> int:
+    """
+    Completes the results of a batch killed on timeout, so it can be recovered with --rerun-dead-letters.
+    The records the engine finished keep their results; every other record gets a result holding only its
+    raw input and a 'dead_letter' entry, and all dead-lettered records are written to the dead-letter file.
+
+    Args:
+        batch_file (str): Path to the batch dataset.
+        output_file (str): Path of the batch's results file.
+        dead_letter_file (Optional[str]): Path of the batch's dead-letter file.
+        batch_timeout (float): The timeout that was exceeded, recorded in the dead-letter entries.
+
+    Returns:
+        int: The number of records the engine had not finished.
+    """
+    # Compressed results are only moved into place when complete, so a killed run left them under '.partial'
+    partial_file = f"{output_file}.partial" if compression_of(output_file) else output_file
+    records = load_dataset(batch_file)
+    results = read_finished_results(partial_file)[:len(records)]
+    finished = len(results)
+    for record in records[finished:]:
+        results.append({"raw": record, "dead_letter": {
+            "step": None,
+            "stage": None,
+            "attempts": 0,
+            "error": f"BatchTimeoutError: Batch did not finish within {batch_timeout}s",
+        }})
+
+    with ResultsWriter(output_file, json_lines=True) as writer:
+        for result in results:
+            writer.write(result)
+    if partial_file != output_file and os.path.exists(partial_file):
+        os.remove(partial_file)
+    if dead_letter_file:
+        write_dead_letters(dead_letter_file, [dead_letter_entry(index, result)
+                                              for index, result in enumerate(results) if "dead_letter" in result])
+    return len(records) - finished
+
+def run_batches(batch_files: List[str], dynamic_pipeline_path: str, script_dir: str, request_id: str, results_output_base_path: str,
+                dead_letter_dir: Optional[str] = None, rerun_dead_letters: bool = False,
+                manifest_dir: Optional[str] = None, resume_from: Optional[str] = None,
+                batch_timeout: Optional[float] = None, speculative: bool = False,
+                speculative_factor: float = 2.0, speculative_min_completed: float = 0.5,
+                compression: Optional[str] = None) -> Dict[int, str]:
     """
     Runs a Docker container for each batch, executing pipeline/engine.py.
+    Batches run concurrently and are polled until each one completed, failed or timed out.
 
     Args:
         batch_files (List[str]): List of paths to individual batch JSON files.
@@ -58,11 +280,41 @@ def run_batches(batch_files: List[str], dynamic_pipeline_path: str, script_dir:
         script_dir (str): Directory containing all transformation scripts.
         request_id (str): Unique ID for the current request.
         results_output_base_path (str): Base directory where results will be written (e.g., 'requests/{request_id}/state_logs').
+        dead_letter_dir (Optional[str]): Directory for each batch's dead-letter file (batch_N.jsonl). Kept outside
+                                         the results directory so get_result does not mix failures into results.
+        rerun_dead_letters (bool): If True, only batches with a dead-letter file are run, processing just those
+                                   records and merging them into the batch's existing results.
+        manifest_dir (Optional[str]): Directory for each batch's run manifest (batch_N.json) holding its script hashes.
+        resume_from (Optional[str]): Step name or position to resume from, reusing each batch's existing results
+                                     for earlier steps. Requires the manifests of the previous run.
+        batch_timeout (Optional[float]): Seconds after which a batch's containers (including a speculative copy)
+                                         are killed and the batch counts as timed out. Its unfinished records are
+                                         dead-lettered (see dead_letter_timed_out_batch). None waits as long as it takes.
+        speculative (bool): If True, a second copy of a batch is started once it runs longer than
+                            speculative_factor times the median duration of the completed batches.
+                            Whichever copy finishes first is kept and the other one is killed.
+                            Not used when rerunning dead letters or resuming, as those update existing files in place.
+        speculative_factor (float): How many times the median batch duration a batch may run before it is copied.
+        speculative_min_completed (float): Fraction of batches that must have completed before the median is trusted.
+        compression (Optional[str]): "gzip" or "zstd" to compress each batch's results and dead-letter file
+                                     (batch_N_transitions.jsonl.gz). Reruns and resumes must use the same setting.
+
+    Returns:
+        Dict[int, str]: The outcome of each batch that was run: "completed", "failed" or "timed_out".
     """
     os.makedirs(results_output_base_path, exist_ok=True)
     print(f"Batch results will be written to: {results_output_base_path}")
+    if dead_letter_dir:
+        os.makedirs(dead_letter_dir, exist_ok=True)
+    # Process logs and speculative copies live next to the results directory, where get_result does not look
+    request_dir = os.path.dirname(os.path.normpath(results_output_base_path))
+    log_dir = os.path.join(request_dir, "logs")
+    attempts_dir = os.path.join(request_dir, "attempts")
+    os.makedirs(log_dir, exist_ok=True)
+    if speculative and (rerun_dead_letters or resume_from is not None):
+        print("WARNING: Speculative execution is not used when rerunning dead letters or resuming.", file=sys.stderr)
+        speculative = False
 
-    processes = []
     start_time = time.time()
 
     # Get GOOGLE_API_KEY from the environment
@@ -73,78 +325,157 @@ def run_batches(batch_files: List[str], dynamic_pipeline_path: str, script_dir:
     if not google_api_key:
         print("WARNING: GOOGLE_API_KEY not found in environment. Docker containers might fail if LLM access is needed.", file=sys.stderr)
 
+    # The batch's own files, by batch number
+    batch_outputs: Dict[int, Tuple[str, Optional[str], Optional[str]]] = {}
+    attempts: Dict[int, List[BatchAttempt]] = {}
+    batch_started: Dict[int, float] = {}
+
+    def launch(i: int, number: int) -> BatchAttempt:
+        output_file, dead_letter_file, manifest_file = batch_outputs[i]
+        work_dir = None
+        if number > 0:
+            # A speculative copy must not write to the files the first copy is still writing
+            work_dir = os.path.join(attempts_dir, f"batch_{i}_attempt_{number}")
+            os.makedirs(work_dir, exist_ok=True)
+            output_file = os.path.join(work_dir, os.path.basename(output_file))
+            dead_letter_file = os.path.join(work_dir, os.path.basename(dead_letter_file)) if dead_letter_file else None
+            manifest_file = os.path.join(work_dir, "manifest.json") if manifest_file else None
+        container_name = f"pipeline-{request_id}-batch{i}-attempt{number}"
+        cmd = build_batch_command(batch_files[i], output_file, dynamic_pipeline_path, script_dir, container_name,
+                                  google_api_key, dead_letter_file=dead_letter_file, rerun_dead_letters=rerun_dead_letters,
+                                  manifest_file=manifest_file, resume_from=resume_from, rate_limit_share=rate_limit_share)
+        print("Docker command:", " ".join(cmd))
+        # Output goes to a log file: an unread pipe would block the container once its buffer is full
+        log_file = open(os.path.join(log_dir, f"batch_{i}_attempt_{number}.log"), "w", encoding='utf-8')
+        process = subprocess.Popen(cmd, stdout=log_file, stderr=subprocess.STDOUT, text=True)
+        return BatchAttempt(i, number, process, container_name, log_file, output_file, dead_letter_file, manifest_file, work_dir)
+
     for i, batch_file in enumerate(batch_files):
         # Each batch will output its results to a unique file within the state_logs directory
-        output_file = os.path.join(results_output_base_path, f"batch_{i}_transitions.jsonl") # Using .jsonl as per state_tracker
-        print(f"Running batch {i} for {batch_file} -> output: {output_file}")
-
-        # The Docker command to run pipeline/engine.py for each batch
-        # IMPORTANT: /app/pipeline/engine.py is the path *inside* the Docker container
-        # The host paths need to be mapped using -v
-        cmd = [
-            "docker", "run", "--rm", # --rm removes the container after it exits
-            "-v", f"{os.getcwd()}:/app", # Mount current working directory to /app inside container
-            "-e", f"GOOGLE_API_KEY={google_api_key}", # Pass the GOOGLE_API_KEY to the container
-            "-e", f"STATE_LOG_PATH=/app/{output_file}", # Pass the specific output file path for state_tracker
-            "data-pipeline:latest", # The name of your Docker image
-            "python", "pipeline/engine.py", # Command to run inside container
-            f"/app/{dynamic_pipeline_path}", # Path to pipeline definition inside container
-            f"/app/{batch_file}",            # Path to batch dataset inside container
-            f"/app/{output_file}",           # Path for output file inside container (should match STATE_LOG_PATH usage)
-            f"/app/{script_dir}"             # Path to scripts directory inside container
-        ]
+        output_file = with_compression(os.path.join(results_output_base_path, f"batch_{i}_transitions.jsonl"), compression) # Using .jsonl as per state_tracker
+        dead_letter_file = with_compression(os.path.join(dead_letter_dir, f"batch_{i}.jsonl"), compression) if dead_letter_dir else None
+        manifest_file = os.path.join(manifest_dir, f"batch_{i}.json") if manifest_dir else None
+        if rerun_dead_letters and not (dead_letter_file and os.path.exists(dead_letter_file)):
+            print(f"Skipping batch {i}: no dead-lettered records to rerun.")
+            continue
+        batch_outputs[i] = (output_file, dead_letter_file, manifest_file)
 
-        print("Docker command:", " ".join(cmd))
-        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        processes.append((i, batch_file, process))
-
-    for i, batch_file, process in processes:
-        stdout, stderr = process.communicate() # Wait for process to complete and get output
-        retcode = process.returncode
-        if retcode != 0:
-            print(f"Batch {i} ({batch_file}) failed with return code {retcode}", file=sys.stderr)
-            print("--- STDOUT ---", file=sys.stderr)
-            print(stdout, file=sys.stderr)
-            print("--- STDERR ---", file=sys.stderr)
-            print(stderr, file=sys.stderr)
-        else:
-            print(f"Batch {i} ({batch_file}) completed successfully.")
-            # Optionally print stdout/stderr for successful runs if needed for debug
-            # print("--- STDOUT ---")
-            # print(stdout)
+    # Every batch runs at once, so each container gets an equal part of the pipeline's rate limits
+    rate_limit_share = 1.0 / max(1, len(batch_outputs))
+    for i, (output_file, _, _) in batch_outputs.items():
+        print(f"Running batch {i} for {batch_files[i]} -> output: {output_file}")
+        attempts[i] = [launch(i, 0)]
+        batch_started[i] = time.time()
+
+    outcomes: Dict[int, str] = {}
+    durations: List[float] = [] # Durations of completed batches, for the speculation threshold
+    while len(outcomes) < len(attempts):
+        for i, batch_attempts in attempts.items():
+            if i in outcomes:
+                continue
+            for attempt in list(batch_attempts):
+                retcode = attempt.process.poll()
+                if retcode is None:
+                    continue
+
+                batch_attempts.remove(attempt)
+                attempt.log_file.close()
+                if retcode != 0:
+                    print(f"Batch {i} ({batch_files[i]}) attempt {attempt.number} failed with return code {retcode}", file=sys.stderr)
+                    print_attempt_log(attempt)
+                    if not batch_attempts:
+                        outcomes[i] = "failed"
+                    continue
 
+                # First successful copy wins; the others are stopped before their files are replaced
+                for other in batch_attempts:
+                    stop_attempt(other)
+                if attempt.number > 0:
+                    promote_attempt(attempt, *batch_outputs[i])
+                    print(f"Batch {i} ({batch_files[i]}) completed successfully (speculative copy won).")
+                else:
+                    print(f"Batch {i} ({batch_files[i]}) completed successfully.")
+                durations.append(attempt.elapsed())
+                outcomes[i] = "completed"
+                break
+
+            if i not in outcomes and batch_timeout is not None and time.time() - batch_started[i] > batch_timeout:
+                for attempt in batch_attempts:
+                    stop_attempt(attempt)
+                outcomes[i] = "timed_out"
+                if rerun_dead_letters or resume_from is not None:
+                    # These runs write a temporary file and leave the previous results and dead letters untouched
+                    print(f"Batch {i} ({batch_files[i]}) timed out after {batch_timeout} seconds. "
+                          "Its previous results and dead letters are unchanged.", file=sys.stderr)
+                    continue
+                unfinished = dead_letter_timed_out_batch(batch_files[i], batch_outputs[i][0], batch_outputs[i][1], batch_timeout)
+                print(f"Batch {i} ({batch_files[i]}) timed out after {batch_timeout} seconds with {unfinished} records "
+                      f"unfinished. They are dead-lettered{' and can be rerun with --rerun-dead-letters' if batch_outputs[i][1] else ''}.",
+                      file=sys.stderr)
+
+        if speculative and durations and len(durations) >= speculative_min_completed * len(attempts):
+            threshold = speculative_factor * statistics.median(durations)
+            for i, batch_attempts in attempts.items():
+                if i not in outcomes and len(batch_attempts) == 1 and batch_attempts[0].number == 0 \
+                        and batch_attempts[0].elapsed() > threshold:
+                    print(f"Batch {i} has run for {batch_attempts[0].elapsed():.1f}s, beyond {threshold:.1f}s. "
+                          "Starting a speculative copy.")
+                    batch_attempts.append(launch(i, 1))
+
+        if len(outcomes) < len(attempts):
+            time.sleep(POLL_INTERVAL)
+
+    shutil.rmtree(attempts_dir, ignore_errors=True) # Winning copies were moved into place
     elapsed = time.time() - start_time
-    print(f"All batches completed in {elapsed:.2f} seconds.")
+    unfinished = {i: outcome for i, outcome in outcomes.items() if outcome != "completed"}
+    if unfinished:
+        print(f"{len(unfinished)} of {len(outcomes)} batches did not complete: {unfinished}", file=sys.stderr)
+    print(f"All batches finished in {elapsed:.2f} seconds.")
+    return outcomes
 
 if __name__ == "__main__":
-    # Expected arguments:
-    # 1: request_id
-    # 2: batch_size
-    # 3: dynamic_pipeline_def_path (e.g., requests/UUID/dynamic_pipeline_definition.json)
-    # 4: dataset_path (e.g., requests/UUID/dataset.json)
-    # 5: script_dir (e.g., requests/UUID/scripts)
-    if len(sys.argv) < 6:
-        print("Usage: python batch_runner.py <request_id> <batch_size> <dynamic_pipeline_path> <dataset_path> <script_dir>", file=sys.stderr)
-        sys.exit(1)
-
-    request_id = sys.argv[1]
-    batch_size = int(sys.argv[2])
-    dynamic_pipeline_path = sys.argv[3]
-    dataset_path = sys.argv[4]
-    script_dir = sys.argv[5]
+    parser = argparse.ArgumentParser(description="Split a dataset into batches and run the pipeline on each batch in Docker.")
+    parser.add_argument("request_id", type=str, help="Unique ID of the request.")
+    parser.add_argument("batch_size", type=int, help="Maximum number of records per batch.")
+    parser.add_argument("dynamic_pipeline_path", type=str, help="Path to the pipeline definition (e.g., requests/UUID/dynamic_pipeline_definition.json).")
+    parser.add_argument("dataset_path", type=str, help="Path to the dataset (e.g., requests/UUID/dataset.json).")
+    parser.add_argument("script_dir", type=str, help="Directory containing the scripts (e.g., requests/UUID/scripts).")
+    parser.add_argument("--rerun-dead-letters", action="store_true",
+                        help="Rerun only the dead-lettered records of an earlier run and merge them into its results.")
+    parser.add_argument("--resume-from", type=str, default=None,
+                        help="Step name or 0-based position to resume from, reusing the stored states of earlier steps.")
+    parser.add_argument("--batch-timeout", type=float, default=None,
+                        help="Seconds after which a batch's containers are killed and the batch counts as timed out.")
+    parser.add_argument("--speculative", action="store_true",
+                        help="Start a second copy of batches running well beyond the median batch time and keep whichever finishes first.")
+    parser.add_argument("--speculative-factor", type=float, default=2.0,
+                        help="Multiple of the median batch duration after which a batch is copied.")
+    parser.add_argument("--speculative-min-completed", type=float, default=0.5,
+                        help="Fraction of batches that must have completed before slow batches are copied.")
+    parser.add_argument("--compression", type=str, default=None, choices=list(COMPRESSION_EXTENSIONS),
+                        help="Compress batch files, results and dead letters (zstd needs the 'zstandard' package).")
+    args = parser.parse_args()
 
     # Derived paths (relative to where batch_runner.py is run)
-    base_path = f"requests/{request_id}" # This is derived for context, not explicitly used for input paths here
+    base_path = f"requests/{args.request_id}" # This is derived for context, not explicitly used for input paths here
     batch_dir = os.path.join(base_path, "batches")
     results_output_base_path = os.path.join(base_path, "results") # Where engine.py will write its state_transitions.jsonl
+    dead_letter_dir = os.path.join(base_path, "dead_letters") # Records that exhausted their retries, per batch
+    manifest_dir = os.path.join(base_path, "manifests") # Script hashes per batch, checked when resuming
 
-    # Ensure batch directory exists before splitting
-    os.makedirs(batch_dir, exist_ok=True)
+    if args.rerun_dead_letters or args.resume_from is not None:
+        # Reuse the batches of the earlier run so batch numbers line up with their results and dead letters
+        batch_files = find_batch_files(batch_dir)
+    else:
+        # Ensure batch directory exists before splitting
+        os.makedirs(batch_dir, exist_ok=True)
+        batch_files = split_dataset(args.dataset_path, batch_dir, args.batch_size, compression=args.compression)
 
-    batch_files = split_dataset(dataset_path, batch_dir, batch_size)
-    
     if not batch_files: # If dataset splitting failed, exit
         sys.exit(1)
 
-    run_batches(batch_files, dynamic_pipeline_path, script_dir, request_id, results_output_base_path)
-
+    run_batches(batch_files, args.dynamic_pipeline_path, args.script_dir, args.request_id, results_output_base_path,
+                dead_letter_dir=dead_letter_dir, rerun_dead_letters=args.rerun_dead_letters,
+                manifest_dir=manifest_dir, resume_from=args.resume_from, batch_timeout=args.batch_timeout,
+                speculative=args.speculative, speculative_factor=args.speculative_factor,
+                speculative_min_completed=args.speculative_min_completed, compression=args.compression)
@@ -0,0 +1,260 @@
+import os
+import sys
+import json
+import math
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from typing import List, Dict, Any, Optional
+
+# Repository root, used to start the API and to locate the stub execution backend
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+STUB_BATCH_RUNNER = os.path.join(ROOT_DIR, "scripts", "load_test", "stub_batch_runner.py")
+
+# Minimal single-step pipeline submitted with every request
+PIPELINE_DEFINITION = {"name": "load_test_pipeline", "steps": [{"name": "noop", "main_script": "noop.py"}]}
+NOOP_SCRIPT = b"def transform(record):\n    return record\n"
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """
+    Returns the nearest-rank percentile of a list of values.
+
+    Args:
+        values (List[float]): The measured values.
+        pct (float): The percentile, between 0 and 100.
+
+    Returns:
+        Optional[float]: The percentile, or None if there are no values.
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+def summarize(samples: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Aggregates request samples per endpoint into counts, error rates and latency percentiles.
+
+    Args:
+        samples (List[Dict[str, Any]]): One {"endpoint", "latency", "ok"} entry per HTTP request.
+
+    Returns:
+        Dict[str, Dict[str, Any]]: Statistics per endpoint, latencies in milliseconds.
+    """
+    summary = {}
+    for endpoint in sorted({sample["endpoint"] for sample in samples}):
+        endpoint_samples = [sample for sample in samples if sample["endpoint"] == endpoint]
+        latencies = [sample["latency"] * 1000 for sample in endpoint_samples]
+        errors = sum(1 for sample in endpoint_samples if not sample["ok"])
+        summary[endpoint] = {
+            "requests": len(endpoint_samples),
+            "errors": errors,
+            "error_rate": round(errors / len(endpoint_samples), 4),
+            **{f"p{p}_ms": round(percentile(latencies, p), 2) for p in (50, 90, 95, 99)},
+            "max_ms": round(max(latencies), 2),
+        }
+    return summary
+
+def read_rss_mb(pid: int) -> Optional[float]:
+    """
+    Reads the resident set size of a process from /proc (Linux only).
+
+    Args:
+        pid (int): The process ID.
+
+    Returns:
+        Optional[float]: The RSS in MiB, or None if it cannot be read.
+    """
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+    return None
+
+def start_server(port: int, work_dir: str, stub_delay: float) -> subprocess.Popen:
+    """
+    Starts the API with uvicorn and the stub execution backend, working in work_dir so
+    request files do not end up in the repository.
+
+    Args:
+        port (int): Port to listen on.
+        work_dir (str): Working directory of the server, where requests/ is created.
+        stub_delay (float): Seconds the stub backend waits before writing results.
+
+    Returns:
+        subprocess.Popen: The server process.
+    """
+    env = dict(os.environ, PIPELINE_BATCH_RUNNER=STUB_BATCH_RUNNER, STUB_BATCH_DELAY=str(stub_delay))
+    cmd = [sys.executable, "-m", "uvicorn", "api.main:app", "--app-dir", ROOT_DIR,
+           "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"]
+    print("Starting API:", " ".join(cmd))
+    # The API prints every submission; only its errors are of interest here
+    return subprocess.Popen(cmd, cwd=work_dir, env=env, stdout=subprocess.DEVNULL)
+
+async def wait_until_ready(client: Any, base_url: str, timeout: float = 30.0):
+    """
+    Polls the index page until the server answers.
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            response = await client.get(f"{base_url}/")
+            if response.status_code < 500:
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f"API at {base_url} did not become ready within {timeout} seconds.")
+
+async def run_session(client: Any, base_url: str, dataset_size: int, batch_size: int,
+                      poll_interval: float, result_timeout: float, samples: List[Dict[str, Any]]):
+    """
+    Submits one pipeline with a generated dataset and polls /get_result until every record is back.
+    """
+    dataset = [{"id": i, "text": f"  sample text {i}  "} for i in range(dataset_size)]
+    definition = json.dumps(PIPELINE_DEFINITION).encode()
+    files = {
+        "pipeline": ("pipeline.json", definition, "application/json"),
+        "dataset": ("dataset.json", json.dumps(dataset).encode(), "application/json"),
+        "pipeline_definition_json": ("pipeline_definition.json", definition, "application/json"),
+        "main_0": ("noop.py", NOOP_SCRIPT, "text/x-python"),
+    }
+    start = time.monotonic()
+    try:
+        response = await client.post(f"{base_url}/submit_pipeline", files=files, data={"batch_size": str(batch_size)})
+        ok = response.status_code == 200
+    except Exception as e:
+        print(f"Submit failed: {e}", file=sys.stderr)
+        ok, response = False, None
+    samples.append({"endpoint": "/submit_pipeline", "latency": time.monotonic() - start, "ok": ok})
+    if not ok:
+        return
+
+    request_id = response.json()["request_id"]
+    deadline = time.monotonic() + result_timeout
+    while time.monotonic() < deadline:
+        await asyncio.sleep(poll_interval)
+        start = time.monotonic()
+        try:
+            response = await client.get(f"{base_url}/get_result/{request_id}")
+            # 404 only means the results are not ready yet
+            ok = response.status_code in (200, 404)
+        except Exception as e:
+            print(f"Poll failed: {e}", file=sys.stderr)
+            ok, response = False, None
+        samples.append({"endpoint": "/get_result", "latency": time.monotonic() - start, "ok": ok})
+        if ok and response.status_code == 200 and len(response.json().get("results", [])) >= dataset_size:
+            return
+    samples.append({"endpoint": "result_timeout", "latency": result_timeout, "ok": False})
+
+async def sample_rss(pid: int, interval: float, started: float, timeline: List[Dict[str, float]], stop: asyncio.Event):
+    """
+    Records the server RSS every interval seconds until stop is set.
+    """
+    while not stop.is_set():
+        rss = read_rss_mb(pid)
+        if rss is not None:
+            timeline.append({"t": round(time.monotonic() - started, 2), "rss_mb": round(rss, 1)})
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
+
+async def run_load_test(args: argparse.Namespace, base_url: str, server_pid: Optional[int]) -> Dict[str, Any]:
+    """
+    Runs args.requests pipeline sessions with at most args.concurrency in flight and returns the report.
+    """
+    import httpx # Only needed to run the load test
+
+    samples: List[Dict[str, Any]] = []
+    timeline: List[Dict[str, float]] = []
+    stop = asyncio.Event()
+    limits = httpx.Limits(max_connections=args.concurrency * 2)
+    async with httpx.AsyncClient(timeout=args.request_timeout, limits=limits) as client:
+        await wait_until_ready(client, base_url)
+        started = time.monotonic()
+        sampler = asyncio.create_task(sample_rss(server_pid, args.rss_interval, started, timeline, stop)) if server_pid else None
+
+        semaphore = asyncio.Semaphore(args.concurrency)
+        async def bounded_session():
+            async with semaphore:
+                await run_session(client, base_url, random.choice(args.dataset_sizes), args.batch_size,
+                                  args.poll_interval, args.result_timeout, samples)
+
+        await asyncio.gather(*(bounded_session() for _ in range(args.requests)))
+        elapsed = time.monotonic() - started
+        stop.set()
+        if sampler:
+            await sampler
+
+    return {
+        "base_url": base_url,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "dataset_sizes": args.dataset_sizes,
+        "elapsed_seconds": round(elapsed, 2),
+        "sessions_per_second": round(args.requests / elapsed, 2) if elapsed else None,
+        "endpoints": summarize(samples),
+        "rss_peak_mb": max((point["rss_mb"] for point in timeline), default=None),
+        "rss_timeline": timeline,
+    }
+
+def print_report(report: Dict[str, Any]):
+    """
+    Prints the latency, error-rate and memory figures of a load test run.
+    """
+    print(f"\n{report['requests']} sessions, concurrency {report['concurrency']}, "
+          f"{report['elapsed_seconds']}s ({report['sessions_per_second']} sessions/s)")
+    print(f"{'endpoint':<20}{'requests':>10}{'errors':>8}{'p50 ms':>10}{'p90 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for endpoint, stats in report["endpoints"].items():
+        print(f"{endpoint:<20}{stats['requests']:>10}{stats['errors']:>8}{stats['p50_ms']:>10}{stats['p90_ms']:>10}"
+              f"{stats['p95_ms']:>10}{stats['p99_ms']:>10}{stats['max_ms']:>10}")
+    if report["rss_timeline"]:
+        print(f"Server RSS: start {report['rss_timeline'][0]['rss_mb']} MiB, peak {report['rss_peak_mb']} MiB, "
+              f"end {report['rss_timeline'][-1]['rss_mb']} MiB")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the pipeline API with concurrent submissions and result polling.")
+    parser.add_argument("--url", type=str, default=None,
+                        help="Base URL of a running API. By default a local API is started with the stub execution backend.")
+    parser.add_argument("--server-pid", type=int, default=None, help="PID of the server given by --url, to sample its RSS.")
+    parser.add_argument("--port", type=int, default=8765, help="Port for the locally started API.")
+    parser.add_argument("--requests", type=int, default=50, help="Total number of pipeline submissions.")
+    parser.add_argument("--concurrency", type=int, default=10, help="Maximum number of sessions in flight.")
+    parser.add_argument("--dataset-sizes", type=lambda value: [int(size) for size in value.split(",")], default=[10, 100, 1000],
+                        help="Comma-separated dataset sizes, one picked at random per submission.")
+    parser.add_argument("--batch-size", type=int, default=50, help="Batch size sent with each submission.")
+    parser.add_argument("--poll-interval", type=float, default=0.5, help="Seconds between /get_result polls of a session.")
+    parser.add_argument("--result-timeout", type=float, default=60.0, help="Seconds a session waits for its results.")
+    parser.add_argument("--request-timeout", type=float, default=30.0, help="Timeout of a single HTTP request.")
+    parser.add_argument("--stub-delay", type=float, default=0.5, help="Seconds the stub backend takes per submission.")
+    parser.add_argument("--rss-interval", type=float, default=1.0, help="Seconds between server RSS samples.")
+    parser.add_argument("--report", type=str, default=None, help="Path to also save the report as JSON.")
+    args = parser.parse_args()
+
+    server = None
+    with tempfile.TemporaryDirectory(prefix="pipeline_load_test_") as work_dir:
+        if args.url:
+            base_url, server_pid = args.url.rstrip("/"), args.server_pid
+        else:
+            server = start_server(args.port, work_dir, args.stub_delay)
+            base_url, server_pid = f"http://127.0.0.1:{args.port}", server.pid
+        try:
+            report = asyncio.run(run_load_test(args, base_url, server_pid))
+        finally:
+            if server:
+                server.terminate()
+                server.wait(timeout=10)
+
+    print_report(report)
+    if args.report:
+        with open(args.report, "w", encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report saved to: {args.report}")
@@ -0,0 +1,103 @@
+import gzip
+import io
+import logging
+from typing import Any, Optional
+
+# Set up logging for this module
+logger = logging.getLogger(__name__)
+
+# File extension of each supported compression, which is also its HTTP Content-Encoding token
+COMPRESSION_EXTENSIONS = {"gzip": ".gz", "zstd": ".zst"}
+# Compression levels favour speed: the files are written once per run, on the batch's critical path
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+
+def compression_of(path: str) -> Optional[str]:
+    """
+    Detects the compression of a file from its extension.
+
+    Args:
+        path (str): The file path, e.g. 'results/batch_0_transitions.jsonl.gz'.
+
+    Returns:
+        Optional[str]: "gzip", "zstd", or None for an uncompressed file.
+    """
+    for compression, extension in COMPRESSION_EXTENSIONS.items():
+        if path.endswith(extension):
+            return compression
+    return None
+
+
+def strip_compression_extension(path: str) -> str:
+    """
+    Removes a compression extension, e.g. 'batch_0.jsonl.gz' -> 'batch_0.jsonl'.
+
+    Args:
+        path (str): The file path.
+
+    Returns:
+        str: The path without its compression extension, or the path itself if it has none.
+    """
+    compression = compression_of(path)
+    return path[:-len(COMPRESSION_EXTENSIONS[compression])] if compression else path
+
+
+def with_compression(path: str, compression: Optional[str]) -> str:
+    """
+    Appends the extension of a compression to a path.
+
+    Args:
+        path (str): The uncompressed file path, e.g. 'batch_0.json'.
+        compression (Optional[str]): "gzip", "zstd", or None.
+
+    Returns:
+        str: The path with the compression's extension.
+
+    Raises:
+        ValueError: If the compression is not supported.
+    """
+    if compression is None:
+        return path
+    if compression not in COMPRESSION_EXTENSIONS:
+        raise ValueError(f"Invalid compression '{compression}'. Expected one of {tuple(COMPRESSION_EXTENSIONS)}.")
+    return path + COMPRESSION_EXTENSIONS[compression]
+
+
+def open_text(path: str, mode: str = "r", compression: Optional[str] = None) -> Any:
+    """
+    Opens a text file for reading, writing or appending, compressing and decompressing transparently.
+    Appending to a compressed file adds a new gzip member or zstd frame, which readers decode as one stream.
+
+    Args:
+        path (str): The file path.
+        mode (str): "r", "w" or "a".
+        compression (Optional[str]): "gzip" or "zstd". Defaults to the compression given by the path's extension,
+                                     so temporary files can be written under a different name.
+
+    Returns:
+        Any: A text file object using UTF-8.
+
+    Raises:
+        ImportError: If a zstd file is opened without the 'zstandard' package installed.
+    """
+    compression = compression or compression_of(path)
+    if compression is None:
+        return open(path, mode, encoding='utf-8')
+    if compression == "gzip":
+        return gzip.open(path, mode + "t", encoding='utf-8', compresslevel=GZIP_LEVEL)
+    if compression != "zstd":
+        raise ValueError(f"Invalid compression '{compression}'. Expected one of {tuple(COMPRESSION_EXTENSIONS)}.")
+
+    try:
+        import zstandard # Optional dependency, only needed for .zst files
+    except ImportError:
+        logger.error(f"Cannot open '{path}': zstd compression requires the 'zstandard' package.")
+        raise
+    raw = open(path, mode + "b")
+    if mode == "r":
+        # Appended files hold several frames, so reading must not stop at the end of the first one
+        stream = zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True)
+    else:
+        stream = zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(raw)
+    return io.TextIOWrapper(stream, encoding='utf-8')
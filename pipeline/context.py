@@ -0,0 +1,203 @@
+import os
+import threading
+import time
+import logging
+from typing import Dict, List, Any, Callable, Hashable, Iterable, Optional
+
+# Set up logging for this module
+logger = logging.getLogger(__name__)
+
+# Fraction of each configured rate limit this worker may use, set by batch_runner.py when several
+# batch containers call the same API at once. Defaults to 1, the whole limit.
+RATE_LIMIT_SHARE = float(os.environ.get("RATE_LIMIT_SHARE", 1))
+
+
+class RateLimiter:
+    """
+    A thread-safe token bucket. Each call to acquire() takes tokens from the bucket,
+    which refills at a constant rate up to its capacity.
+    """
+    def __init__(self, rate: Optional[float] = None, capacity: Optional[float] = None):
+        """
+        Initializes the RateLimiter.
+
+        Args:
+            rate (Optional[float]): Tokens added per second. None disables limiting.
+            capacity (Optional[float]): Maximum burst size. Defaults to the rate (one second of burst), minimum 1.
+        """
+        if rate is not None and rate <= 0:
+            raise ValueError("Rate limiter rate must be positive.")
+        self.rate = rate
+        self.capacity = max(1.0, float(capacity if capacity is not None else (rate or 1.0)))
+        self._tokens = self.capacity
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """
+        Blocks until the requested tokens are available and takes them.
+
+        Args:
+            tokens (float): Number of tokens to take, e.g. one per API request.
+
+        Returns:
+            float: The number of seconds spent waiting.
+
+        Raises:
+            ValueError: If more tokens are requested than the bucket can ever hold.
+        """
+        if self.rate is None:
+            return 0.0
+        if tokens > self.capacity:
+            raise ValueError(f"Cannot acquire {tokens} tokens from a rate limiter with capacity {self.capacity}.")
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.rate)
+                self._last_refill = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                delay = (tokens - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class HookContext:
+    """
+    Shared resources handed to hooks whose 'transform' or 'transform_frame' accepts a second
+    'context' argument. One context lives for the whole worker process, so clients and rate
+    limiters are reused across records and batches instead of being rebuilt per call.
+    """
+    def __init__(self, rate_limits: Optional[Dict[str, Dict[str, float]]] = None,
+                 rate_limit_share: Optional[float] = None):
+        """
+        Initializes the HookContext.
+
+        Args:
+            rate_limits (Optional[Dict[str, Dict[str, float]]]): Token bucket settings per limiter name,
+                                                                 e.g. {"openai": {"rate": 5, "capacity": 10}}.
+                                                                 Limiters that are not configured never block.
+            rate_limit_share (Optional[float]): Fraction of each rate and capacity used by this worker, so that
+                                                workers running side by side stay within the limit together.
+                                                Defaults to RATE_LIMIT_SHARE.
+
+        Raises:
+            ValueError: If the share is not between 0 (exclusive) and 1.
+        """
+        self.rate_limit_share = RATE_LIMIT_SHARE if rate_limit_share is None else float(rate_limit_share)
+        if not 0 < self.rate_limit_share <= 1:
+            raise ValueError(f"Invalid rate limit share {self.rate_limit_share}. Expected a fraction between 0 and 1.")
+        self._rate_limit_config = rate_limits or {}
+        self._clients: Dict[str, Any] = {}
+        self._limiters: Dict[str, RateLimiter] = {}
+        self._lock = threading.RLock() # Re-entrant so client factories may use the context themselves
+
+    def client(self, name: str, factory: Callable[[], Any]) -> Any:
+        """
+        Returns the pooled client registered under a name, creating it with the factory on first use.
+
+        Args:
+            name (str): The client name, e.g. "openai".
+            factory (Callable[[], Any]): Builds the client, e.g. lambda: OpenAI(api_key=...).
+
+        Returns:
+            Any: The shared client instance.
+        """
+        with self._lock:
+            if name not in self._clients:
+                logger.info(f"Creating pooled client '{name}'.")
+                self._clients[name] = factory()
+            return self._clients[name]
+
+    def http_session(self, name: str = "http", pool_maxsize: int = 10) -> Any:
+        """
+        Returns a shared requests.Session that keeps connections alive between calls.
+
+        Args:
+            name (str): The session name; sessions with different names use separate pools.
+            pool_maxsize (int): Maximum number of connections kept per host.
+
+        Returns:
+            requests.Session: The shared session.
+        """
+        def build_session():
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_maxsize, pool_maxsize=pool_maxsize)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            return session
+        return self.client(name, build_session)
+
+    def rate_limiter(self, name: str) -> RateLimiter:
+        """
+        Returns the rate limiter registered under a name, shared by every hook in the worker.
+        Its rate and capacity are the configured ones scaled by the worker's rate_limit_share.
+
+        Args:
+            name (str): The limiter name, matching a key of the pipeline's "rate_limits".
+
+        Returns:
+            RateLimiter: The shared limiter.
+        """
+        with self._lock:
+            if name not in self._limiters:
+                config = self._rate_limit_config.get(name, {})
+                rate, capacity = config.get("rate"), config.get("capacity")
+                self._limiters[name] = RateLimiter(rate * self.rate_limit_share if rate is not None else None,
+                                                   capacity * self.rate_limit_share if capacity is not None else None)
+            return self._limiters[name]
+
+    def map_batched(self, fn: Callable[[List[Any]], List[Any]], items: Iterable[Any], batch_size: int,
+                    key: Optional[Callable[[Any], Hashable]] = None, limiter: Optional[str] = None) -> List[Any]:
+        """
+        Micro-batches items into calls of fn, so one request can carry several similar items.
+        Items are grouped by key before chunking and results are returned in the original item order.
+        Only items passed in the same call are batched together. Record hooks run one record at a time,
+        so batching across records needs a frame step, whose hook can pass a whole column as items.
+
+        Args:
+            fn (Callable[[List[Any]], List[Any]]): Processes a list of items and returns one result per item.
+            items (Iterable[Any]): The items to process.
+            batch_size (int): Maximum number of items per call.
+            key (Optional[Callable[[Any], Hashable]]): Groups similar items, e.g. by model or prompt template.
+            limiter (Optional[str]): Name of the rate limiter to acquire once per call.
+
+        Returns:
+            List[Any]: One result per item, in input order.
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1.")
+        items = list(items)
+        groups: Dict[Hashable, List[int]] = {}
+        for index, item in enumerate(items):
+            groups.setdefault(key(item) if key else None, []).append(index)
+
+        results: List[Any] = [None] * len(items)
+        for indices in groups.values():
+            for start in range(0, len(indices), batch_size):
+                chunk = indices[start:start + batch_size]
+                if limiter:
+                    self.rate_limiter(limiter).acquire()
+                chunk_results = fn([items[i] for i in chunk])
+                if len(chunk_results) != len(chunk):
+                    raise ValueError(f"Batched call returned {len(chunk_results)} results for {len(chunk)} items.")
+                for i, result in zip(chunk, chunk_results):
+                    results[i] = result
+        return results
+
+    def close(self):
+        """
+        Closes every pooled client that exposes a close() method.
+        """
+        with self._lock:
+            for name, client in self._clients.items():
+                if hasattr(client, "close"):
+                    try:
+                        client.close()
+                    except Exception as e:
+                        logger.warning(f"Error closing pooled client '{name}': {e}")
+            self._clients.clear()
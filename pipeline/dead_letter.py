@@ -0,0 +1,92 @@
+import json
+import os
+import logging
+from datetime import datetime
+from typing import Dict, List, Any
+
+from .compression import compression_of, strip_compression_extension, with_compression, open_text
+
+# Set up logging for this module
+logger = logging.getLogger(__name__)
+
+
+def default_dead_letter_path(output_path: str) -> str:
+    """
+    Derives the dead-letter file path from a results file path,
+    e.g. 'results/batch_0.json' -> 'results/batch_0.dead_letter.jsonl'.
+    A compressed results file gets a dead-letter file with the same compression.
+
+    Args:
+        output_path (str): The path of the results file.
+
+    Returns:
+        str: The path of the dead-letter JSONL file.
+    """
+    root, _ = os.path.splitext(strip_compression_extension(output_path))
+    return with_compression(f"{root}.dead_letter.jsonl", compression_of(output_path))
+
+
+def dead_letter_entry(index: int, result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Builds the dead-letter entry of a dead-lettered state record: its position in the batch,
+    its raw input record and the failure details.
+
+    Args:
+        index (int): The position of the record in the batch.
+        result (Dict[str, Any]): The state record, carrying a 'dead_letter' entry.
+
+    Returns:
+        Dict[str, Any]: The entry to write to the dead-letter file.
+    """
+    return {"index": index, "record": result["raw"], **result["dead_letter"]}
+
+
+def write_dead_letters(dead_letter_path: str, entries: List[Dict[str, Any]]) -> int:
+    """
+    Writes one JSON line per dead-letter entry, compressed if the path ends in .gz or .zst.
+    Removes a stale file if nothing failed.
+
+    Args:
+        dead_letter_path (str): The path of the dead-letter JSONL file.
+        entries (List[Dict[str, Any]]): Entries built with dead_letter_entry, in batch order.
+
+    Returns:
+        int: The number of dead-lettered records written.
+    """
+    if not entries:
+        if os.path.exists(dead_letter_path):
+            os.remove(dead_letter_path)
+            logger.info(f"No dead-lettered records left. Removed: {dead_letter_path}")
+        return 0
+
+    dead_letter_directory = os.path.dirname(dead_letter_path)
+    if dead_letter_directory:
+        os.makedirs(dead_letter_directory, exist_ok=True)
+    timestamp = datetime.utcnow().isoformat()
+    with open_text(dead_letter_path, "w") as f:
+        for entry in entries:
+            f.write(json.dumps({"timestamp": timestamp, **entry}) + "\n")
+    logger.warning(f"{len(entries)} dead-lettered records written to: {dead_letter_path}")
+    return len(entries)
+
+
+def load_dead_letters(dead_letter_path: str) -> List[Dict[str, Any]]:
+    """
+    Loads the entries of a dead-letter JSONL file.
+
+    Args:
+        dead_letter_path (str): The path of the dead-letter JSONL file.
+
+    Returns:
+        List[Dict[str, Any]]: The entries, each with 'index' and 'record' keys. Empty if the file does not exist.
+
+    Raises:
+        json.JSONDecodeError: If a line is not valid JSON.
+    """
+    if not os.path.exists(dead_letter_path):
+        logger.info(f"No dead-letter file found at: {dead_letter_path}")
+        return []
+    with open_text(dead_letter_path, "r") as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    logger.info(f"Loaded {len(entries)} dead-lettered records from: {dead_letter_path}")
+    return entries
@@ -0,0 +1,70 @@
+import hashlib
+import json
+import logging
+from typing import Dict, List, Any, Tuple, Union
+
+# Set up logging for this module
+logger = logging.getLogger(__name__)
+
+
+def parse_dedup_config(config: Union[bool, Dict[str, Any], None]) -> Tuple[bool, List[str]]:
+    """
+    Reads the "dedup" setting of a pipeline definition.
+
+    Args:
+        config (Union[bool, Dict[str, Any], None]): true/false, or {"enabled": true, "ignore_fields": ["id"]}.
+
+    Returns:
+        Tuple[bool, List[str]]: Whether deduplication is enabled, and the fields left out of the comparison.
+
+    Raises:
+        ValueError: If the setting is neither a boolean nor a dictionary.
+    """
+    if config is None or isinstance(config, bool):
+        return bool(config), []
+    if isinstance(config, dict):
+        return bool(config.get("enabled", True)), list(config.get("ignore_fields", []))
+    raise ValueError(f"Invalid dedup configuration: {config}. Expected a boolean or a dictionary.")
+
+
+def dedup_key(record: Dict[str, Any], ignore_fields: List[str]) -> str:
+    """
+    Hashes the canonical JSON form of a record, so records that differ only in key order
+    or in ignored fields get the same key.
+
+    Args:
+        record (Dict[str, Any]): The input record.
+        ignore_fields (List[str]): Fields left out of the comparison, e.g. a per-row "id".
+
+    Returns:
+        str: The SHA-256 hex digest of the canonicalized record.
+    """
+    canonical = {key: value for key, value in record.items() if key not in ignore_fields}
+    payload = json.dumps(canonical, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def fan_out(result: Dict[str, Any], record: Dict[str, Any], ignore_fields: List[str]) -> Dict[str, Any]:
+    """
+    Builds the state history of a duplicate record from the history of the record that was actually processed.
+    The copy gets the duplicate's own raw record, and its ignored fields are restored in every snapshot
+    that carries them.
+
+    Args:
+        result (Dict[str, Any]): The state history of the processed (representative) record.
+        record (Dict[str, Any]): The duplicate input record.
+        ignore_fields (List[str]): Fields left out of the comparison.
+
+    Returns:
+        Dict[str, Any]: The state history of the duplicate.
+    """
+    restored = {field: record[field] for field in ignore_fields if field in record}
+    copy: Dict[str, Any] = {"raw": dict(record)}
+    for key, value in result.items():
+        if key == "raw":
+            continue
+        if isinstance(value, dict) and key != "dead_letter":
+            value = dict(value)
+            value.update({field: restored[field] for field in restored if field in value})
+        copy[key] = value
+    return copy
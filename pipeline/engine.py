@@ -3,6 +3,7 @@ import json
 import os
 import logging
 import argparse # For formal command-line argument parsing
+from typing import Optional
 # Set up basic logging configuration
 # # This ensures logs from all modules (loader, hooks, executor, state_tracker) are captured
 logging.basicConfig(level=logging.INFO, # Default logging level
@@ -12,10 +13,20 @@ logger = logging.getLogger(__name__)
 # Import components from your pipeline package
 from pipeline.loader import load_pipeline_definition, load_dataset
 from pipeline.executor import PipelineExecutor
+from pipeline.dead_letter import default_dead_letter_path, dead_letter_entry, write_dead_letters, load_dead_letters
+from pipeline.results import ResultsWriter, iter_results
+from pipeline.compression import compression_of, strip_compression_extension
+from pipeline.resume import (default_manifest_path, write_manifest, load_manifest, script_hashes,
+                             resolve_step_index, verify_upstream_scripts)
  # Ensure state_tracker is imported, although its function is called by Executor
+from pipeline import state_tracker
 from pipeline.state_tracker import record_state_transition 
 
-def run_pipeline(pipeline_path: str, dataset_path: str, output_path: str, script_dir: str):
+def run_pipeline(pipeline_path: str, dataset_path: str, output_path: str, script_dir: str,
+                 dead_letter_path: Optional[str] = None, rerun_dead_letters: bool = False,
+                 state_log_level: Optional[str] = None, state_log_sample_rate: Optional[float] = None,
+                 window_size: Optional[int] = None, manifest_path: Optional[str] = None,
+                 resume_from: Optional[str] = None, previous_results_path: Optional[str] = None):
         """
         Orchestrates the entire pipeline execution process.
 
@@ -23,13 +34,41 @@ def run_pipeline(pipeline_path: str, dataset_path: str, output_path: str, script
             pipeline_path (str): Path to the JSON file defining the pipeline structure.
             dataset_path (str): Path to the JSON file containing the input dataset.
             output_path (str): Path to the JSON file where the final processed results (state table) will be saved.
+                               Results are streamed as they are produced: one object per line for a '.jsonl'
+                               path, otherwise a JSON array. A '.gz' or '.zst' suffix compresses it.
             script_dir (str): Directory containing all transformation scripts (pre, main, post).
+            dead_letter_path (Optional[str]): Path to the JSONL file receiving records whose hooks exhausted their retries.
+                                    Defaults to the output path with a '.dead_letter.jsonl' suffix.
+            rerun_dead_letters (bool): If True, only the records in dead_letter_path are processed and their
+                                       results are merged into the existing results at output_path.
+            state_log_level (Optional[str]): "full", "final", "errors" or "sampled". Overrides the definition's
+                                             "state_log" block.
+            state_log_sample_rate (Optional[float]): Percentage of records fully traced at the "sampled" level.
+            window_size (Optional[int]): Number of records processed and held in memory at once. Overrides the
+                                         definition's "window_size".
+            manifest_path (Optional[str]): Path to the JSON file recording the script hashes of this run.
+                                           Defaults to the output path with a '.manifest.json' suffix.
+                                           A dead-letter rerun leaves it unchanged, so resuming after a step
+                                           whose scripts changed for the rerun is refused.
+            resume_from (Optional[str]): Name (or 0-based position) of the step to resume from. Each record starts
+                                         from its stored state after the previous step in previous_results_path,
+                                         and only this step and later ones run. The scripts of earlier steps must
+                                         match the previous run's manifest.
+            previous_results_path (Optional[str]): Results to resume from. Defaults to output_path, whose manifest
+                                                   is manifest_path; otherwise its manifest sits next to it.
         """
+        dead_letter_path = dead_letter_path or default_dead_letter_path(output_path)
+        manifest_path = manifest_path or default_manifest_path(output_path)
+        previous_manifest_path = default_manifest_path(previous_results_path) if previous_results_path else manifest_path
+        previous_results_path = previous_results_path or output_path
         logger.info(f"Starting pipeline run with parameters:")
         logger.info(f"  - Pipeline Definition: {pipeline_path}")
         logger.info(f"  - Input Dataset: {dataset_path}")
         logger.info(f"  - Output Results: {output_path}")
         logger.info(f"  - Script Directory: {script_dir}")
+        logger.info(f"  - Dead Letters: {dead_letter_path}{' (rerun)' if rerun_dead_letters else ''}")
+        if resume_from is not None:
+            logger.info(f"  - Resume From: step '{resume_from}' of {previous_results_path}")
 
         pipeline_definition = {}
         dataset = []
@@ -38,26 +77,68 @@ def run_pipeline(pipeline_path: str, dataset_path: str, output_path: str, script
         try:
             # Load pipeline definition and dataset
             pipeline_definition = load_pipeline_definition(pipeline_path)
-            dataset = load_dataset(dataset_path)
+            if rerun_dead_letters and resume_from is not None:
+                raise ValueError("Rerunning dead letters and resuming from a step cannot be combined.")
+            if rerun_dead_letters:
+                # Only the dead-lettered records are processed; everything else keeps its existing result
+                dead_letters = load_dead_letters(dead_letter_path)
+                dataset = [entry["record"] for entry in dead_letters]
+            elif resume_from is not None:
+                # Records continue from their stored state after the previous step; upstream steps must be unchanged
+                start_step = resolve_step_index(pipeline_definition, resume_from)
+                verify_upstream_scripts(load_manifest(previous_manifest_path),
+                                        script_hashes(pipeline_definition, script_dir), start_step)
+                logger.info(f"Resuming from step {start_step} with the states stored in: {previous_results_path}")
+            else:
+                dataset = load_dataset(dataset_path)
+
+            # When the state log and the output are the same file (as in batch_runner), the streamed
+            # output already holds every state record, so the executor must not append to it as well
+            enable_state_log = os.path.abspath(state_tracker.LOG_PATH) != os.path.abspath(output_path)
 
             # Initialize the pipeline executor
-            executor = PipelineExecutor(pipeline_definition)
+            executor = PipelineExecutor(pipeline_definition, enable_state_log=enable_state_log,
+                                        state_log_level=state_log_level, state_log_sample_rate=state_log_sample_rate,
+                                        window_size=window_size)
 
-            # Execute the pipeline
+            # Execute the pipeline, streaming each result to the output file as its window completes
             logger.info("Executing pipeline on dataset...")
-            results = executor.execute(dataset, script_dir)
-            logger.info("Pipeline execution finished.")
+            if resume_from is not None:
+                # Previous histories are read window by window; records dead-lettered upstream keep theirs
+                results = executor.iter_resume(iter_results(previous_results_path), script_dir, start_step)
+            else:
+                results = executor.iter_execute(dataset, script_dir)
+            write_path = output_path
+            if rerun_dead_letters:
+                # Rerun results replace the dead-lettered entries while the existing results are copied to a new file
+                rerun_results = {entry["index"]: result for entry, result in zip(dead_letters, results)}
+                logger.info(f"Merging {len(rerun_results)} rerun records into existing results from: {output_path}")
+                results = (rerun_results.get(index, result) for index, result in enumerate(iter_results(output_path)))
+                write_path = f"{output_path}.rerun.tmp" # Not picked up as a result file while it is written
+            elif resume_from is not None:
+                if os.path.abspath(previous_results_path) == os.path.abspath(output_path):
+                    write_path = f"{output_path}.rerun.tmp"
 
-            # Ensure the output directory exists before writing the results
-            output_directory = os.path.dirname(output_path)
-            if output_directory: # Only try to create if output_path is not just a filename
-                os.makedirs(output_directory, exist_ok=True)
-                logger.info(f"Ensured output directory exists: {output_directory}")
-
-            # Write the results to the output file
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(results, f, indent=2)
-            logger.info(f"Pipeline results successfully saved to: {output_path}")
+            dead_letter_entries = []
+            with ResultsWriter(write_path, json_lines=strip_compression_extension(output_path).endswith(".jsonl"),
+                               compression=compression_of(output_path)) as writer:
+                for index, result in enumerate(results):
+                    writer.write(result)
+                    if "dead_letter" in result:
+                        dead_letter_entries.append(dead_letter_entry(index, result))
+            executor.close()
+            if write_path != output_path:
+                os.replace(write_path, output_path)
+            logger.info("Pipeline execution finished.")
+            logger.info(f"Pipeline results ({writer.count} records) successfully saved to: {output_path}")
+            write_dead_letters(dead_letter_path, dead_letter_entries)
+            logger.info(f"Run metrics: {executor.metrics}")
+            if rerun_dead_letters:
+                # Most merged results still come from the scripts the manifest recorded; recording the current
+                # hashes would let a later resume reuse states produced by scripts that have since changed
+                logger.info(f"Rerun merged into earlier results; run manifest left unchanged: {manifest_path}")
+            else:
+                write_manifest(manifest_path, pipeline_definition, script_dir, metrics=executor.metrics)
 
         except FileNotFoundError as e:
             logger.critical(f"A required file was not found: {e}")
@@ -88,9 +169,32 @@ if __name__ == "__main__":
                             help="Path to the JSON file where the final processed results (state table) will be saved.")
         parser.add_argument("script_dir", type=str,
                             help="Directory containing all transformation scripts (pre, main, post).")
+        parser.add_argument("--dead-letter-path", type=str, default=None,
+                            help="Path to the JSONL file for records that exhausted their retries (default: next to the output).")
+        parser.add_argument("--rerun-dead-letters", action="store_true",
+                            help="Process only the dead-lettered records and merge them into the existing output.")
+
+        parser.add_argument("--state-log-level", type=str, default=None, choices=["full", "final", "errors", "sampled"],
+                            help="How much of each record's history to keep (default: the definition's setting, or full).")
+        parser.add_argument("--state-log-sample-rate", type=float, default=None,
+                            help="Percentage of records traced at every stage with --state-log-level sampled.")
+
+        parser.add_argument("--window-size", type=int, default=None,
+                            help="Number of records processed and held in memory at once (default: the definition's setting).")
+
+        parser.add_argument("--manifest-path", type=str, default=None,
+                            help="Path to the JSON file recording this run's script hashes (default: next to the output).")
+        parser.add_argument("--resume-from", type=str, default=None,
+                            help="Step name or 0-based position to resume from, reusing stored states of earlier steps.")
+        parser.add_argument("--previous-results", type=str, default=None,
+                            help="Results to resume from (default: the output path).")
 
         args = parser.parse_args()
 
         # Call the main pipeline function with parsed arguments
-        run_pipeline(args.pipeline_path, args.dataset_path, args.output_path, args.script_dir)
+        run_pipeline(args.pipeline_path, args.dataset_path, args.output_path, args.script_dir,
+                     dead_letter_path=args.dead_letter_path, rerun_dead_letters=args.rerun_dead_letters,
+                     state_log_level=args.state_log_level, state_log_sample_rate=args.state_log_sample_rate,
+                     window_size=args.window_size, manifest_path=args.manifest_path,
+                     resume_from=args.resume_from, previous_results_path=args.previous_results)
 
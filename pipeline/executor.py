@@ -1,37 +1,107 @@
-import importlib.util # Still needed if we want to directly load modules (though hooks.py does it now)
 import os
+import random
+import itertools
 import logging
-from typing import Dict, List, Any, Optional
+from collections import Counter
+from types import ModuleType
+from typing import Dict, List, Any, Iterable, Iterator, Optional
 
 # Import the refined functions from hooks and state_tracker
-from .hooks import load_script_module, execute_hook
+from .hooks import load_script_module, execute_hook, execute_frame_hook, call_with_timeout
+from .context import HookContext
+from .frames import FRAME_FORMATS, records_to_frame, frame_to_records, copy_frame
+from .retry import RetryPolicy, HookRetryError
+from .dedup import parse_dedup_config, dedup_key, fan_out
+from .resume import seed_state
 from .state_tracker import record_state_transition
 
 # Set up logging for this module
 logger = logging.getLogger(__name__)
 
+# Hook stages of a step, in execution order
+STAGES = ("pre", "main", "post")
+# "record" steps call transform(record) per record, "frame" steps call transform_frame(frame) once per batch
+STEP_TYPES = ("record", "frame")
+# How much of each record's history is kept: every stage, the final record only,
+# only dead-lettered records in the state log, or every stage for a sampled percentage of records
+STATE_LOG_LEVELS = ("full", "final", "errors", "sampled")
+# Number of records processed (and held in memory) at once when the definition sets no "window_size"
+DEFAULT_WINDOW_SIZE = 1000
+
 class PipelineExecutor:
     """
     Executes a defined pipeline on a dataset, applying pre-processing, main transformations,
-    and post-processing scripts to each record.
+    and post-processing scripts to each record, or to the whole batch for 'frame' steps.
     Optionally logs the state transitions of each record.
     """
-    def __init__(self, pipeline_definition: Dict[str, Any], enable_state_log: bool = True):
+    def __init__(self, pipeline_definition: Dict[str, Any], enable_state_log: bool = True,
+                 context: Optional[HookContext] = None, state_log_level: Optional[str] = None,
+                 state_log_sample_rate: Optional[float] = None, window_size: Optional[int] = None,
+                 dedup: Optional[Any] = None):
         """
         Initializes the PipelineExecutor.
 
         Args:
             pipeline_definition (Dict[str, Any]): A dictionary defining the pipeline steps.
                                                   Expected format: {"steps": [{"name": "step_name", "main_script": "path/to/main.py", ...}]}
+                                                  A step with "type": "frame" receives the batch as a frame
+                                                  ("frame_format": "pandas" or "numpy").
+                                                  A "retry" block on a step (or the whole definition) retries
+                                                  failing hooks; records that exhaust it are dead-lettered.
+                                                  A "timeout" in seconds on a step (or the whole definition)
+                                                  fails any hook call that takes longer, as a retryable error.
             enable_state_log (bool): If True, records the state of each record after each step
                                      to a log file.
+            context (Optional[HookContext]): Shared clients and rate limiters passed to hooks that accept a
+                                             'context' argument. Defaults to a new context configured from
+                                             the definition's "rate_limits".
+            state_log_level (Optional[str]): One of STATE_LOG_LEVELS. Overrides the definition's
+                                             "state_log": {"level": ...}; defaults to "full".
+                                             Records that are not traced get only 'raw' and 'final'
+                                             states, and their stages are neither copied nor serialized.
+            state_log_sample_rate (Optional[float]): Percentage (0-100) of records traced at every stage
+                                                     when the level is "sampled".
+            window_size (Optional[int]): Number of records processed together and held in memory by
+                                         iter_execute. Overrides the definition's "window_size";
+                                         defaults to DEFAULT_WINDOW_SIZE. A pipeline with frame steps runs the
+                                         whole dataset as one window, so every frame holds the whole batch.
+            dedup (Optional[Any]): true, or {"enabled": true, "ignore_fields": [...]}, to process each distinct
+                                   record once and copy its history to every duplicate. Overrides the
+                                   definition's "dedup"; disabled by default. Ignored, with a warning,
+                                   when frame steps run, since they must see every record.
         """
         if not isinstance(pipeline_definition, dict) or "steps" not in pipeline_definition:
             logger.error("Invalid pipeline definition: Missing 'steps' key or not a dictionary.")
             raise ValueError("Invalid pipeline definition provided.")
+        for step in pipeline_definition["steps"]:
+            if step.get("type", "record") not in STEP_TYPES:
+                raise ValueError(f"Invalid step type '{step.get('type')}' for step '{step.get('name')}'. Expected one of {STEP_TYPES}.")
+            if step.get("type") == "frame" and step.get("frame_format", "pandas") not in FRAME_FORMATS:
+                raise ValueError(f"Invalid frame format '{step.get('frame_format')}' for step '{step.get('name')}'. Expected one of {FRAME_FORMATS}.")
+            RetryPolicy.from_config(step.get("retry", pipeline_definition.get("retry"))) # Fail fast on invalid retry settings
 
         self.pipeline_definition = pipeline_definition
+        for step in pipeline_definition["steps"]:
+            self._hook_timeout(step) # Fail fast on invalid timeouts
         self.enable_state_log = enable_state_log
+        self.context = context or HookContext(pipeline_definition.get("rate_limits"))
+
+        state_log_config = pipeline_definition.get("state_log", {})
+        self.state_log_level = state_log_level or state_log_config.get("level", "full")
+        self.state_log_sample_rate = float(state_log_sample_rate if state_log_sample_rate is not None
+                                           else state_log_config.get("sample_rate", 100))
+        if self.state_log_level not in STATE_LOG_LEVELS:
+            raise ValueError(f"Invalid state log level '{self.state_log_level}'. Expected one of {STATE_LOG_LEVELS}.")
+        if not 0 <= self.state_log_sample_rate <= 100:
+            raise ValueError(f"Invalid state log sample rate {self.state_log_sample_rate}. Expected a percentage between 0 and 100.")
+
+        self.window_size = int(window_size or pipeline_definition.get("window_size", DEFAULT_WINDOW_SIZE))
+        if self.window_size < 1:
+            raise ValueError(f"Invalid window size {self.window_size}. Expected a positive number of records.")
+
+        self.dedup, self.dedup_ignore_fields = parse_dedup_config(dedup if dedup is not None else pipeline_definition.get("dedup"))
+        # Counters of the last run, e.g. for the run manifest
+        self.metrics: Dict[str, Any] = {}
         logger.info("PipelineExecutor initialized.")
 
     def execute(self, dataset: List[Dict[str, Any]], script_dir: str) -> List[Dict[str, Any]]:
@@ -46,7 +116,30 @@ class PipelineExecutor:
         Returns:
             List[Dict[str, Any]]: A list of dictionaries, where each dictionary represents
                                   the final state transition log for a processed record.
-                                  Returns only the 'raw' and final states if state logging is disabled.
+                                  Records that are not traced (see state_log_level) hold only their
+                                  'raw' and 'final' states.
+                                  Records whose hooks exhausted their retries carry a 'dead_letter' entry
+                                  and the snapshots of the stages they completed.
+        """
+        return list(self.iter_execute(dataset, script_dir))
+
+    def iter_execute(self, dataset: List[Dict[str, Any]], script_dir: str, start_step: int = 0,
+                     initial_states: Optional[List[Dict[str, Any]]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Executes the defined pipeline window by window and yields each record's state history in dataset order,
+        so callers can write results incrementally while at most one window of histories is held in memory.
+
+        Args:
+            dataset (List[Dict[str, Any]]): A list of dictionaries, where each dictionary
+                                            represents a record to be processed.
+            script_dir (str): The base directory where all pipeline scripts (pre, main, post) are located.
+            start_step (int): Position of the first step to execute. Earlier steps are skipped, so the dataset
+                              must hold each record as it left the step before.
+            initial_states (Optional[List[Dict[str, Any]]]): State histories to continue, one per record
+                                                              (e.g. from a previous run). Defaults to {"raw": record}.
+
+        Yields:
+            Dict[str, Any]: The state history of each record, as returned by execute().
         """
         if not isinstance(dataset, list):
             logger.error("Invalid dataset: Expected a list of dictionaries.")
@@ -54,77 +147,331 @@ class PipelineExecutor:
         if not os.path.isdir(script_dir):
             logger.error(f"Script directory not found or is not a directory: {script_dir}")
             raise FileNotFoundError(f"Script directory not found: {script_dir}")
+        if initial_states is not None and len(initial_states) != len(dataset):
+            raise ValueError("initial_states must hold one state history per dataset record.")
+
+        logger.info(f"Starting pipeline execution for {len(dataset)} records"
+                    f"{f', from step {start_step}' if start_step else ''}.")
+        self.metrics = {"records": len(dataset), "unique_records": len(dataset), "dedup_ratio": 0.0, "dead_lettered": 0}
+        if self.dedup and initial_states is None and self._has_frame_steps(start_step):
+            # Frame results such as a mean or rank depend on every record, duplicates included
+            logger.warning("Deduplication is ignored because frame steps must see every record of the batch.")
+            results = self._iter_windows(dataset, script_dir, start_step, initial_states)
+        elif self.dedup and initial_states is None:
+            results = self._iter_deduplicated(dataset, script_dir, start_step)
+        else:
+            results = self._iter_windows(dataset, script_dir, start_step, initial_states)
 
-        all_transitions: List[Dict[str, Any]] = []
-
-        logger.info(f"Starting pipeline execution for {len(dataset)} records.")
-        for i, record in enumerate(dataset):
-            # Create a deep copy of the record for processing to avoid modifying original dataset
-            current_record = dict(record) # Start with a copy of the raw record
-            state_record: Dict[str, Any] = {"raw": dict(record)} # Store raw for logging
-
-            logger.debug(f"Processing record {i+1}/{len(dataset)}")
-
-            for step in self.pipeline_definition.get("steps", []):
-                step_name = step.get("name", "unnamed_step")
-                logger.debug(f"Executing step '{step_name}' for record {i+1}")
-
-                # --- Handle Pre-script ---
-                if step.get("pre_script"):
-                    pre_script_path = os.path.join(script_dir, step["pre_script"])
-                    # Generate a unique module name for this specific hook and step
-                    pre_module_name = f"pre_{step_name}_module_{os.path.basename(pre_script_path).replace('.', '_')}"
-                    pre_module = load_script_module(pre_script_path, pre_module_name)
-                    if pre_module:
-                        transformed_pre_record = execute_hook(pre_module, current_record)
-                        # Only update current_record if transformation was successful and returned a dict
-                        if transformed_pre_record is not current_record: # Check if a new dict was returned
-                            current_record = transformed_pre_record
-                        state_record[f"pre_{step_name}"] = dict(current_record)
-                    else:
-                        logger.warning(f"Failed to load or execute pre-script for step '{step_name}'. Record unchanged.")
-                        state_record[f"pre_{step_name}"] = dict(current_record) # Log current state even if script failed
-
-                # --- Handle Main Script ---
-                if step.get("main_script"):
-                    main_script_path = os.path.join(script_dir, step["main_script"])
-                    main_module_name = f"main_{step_name}_module_{os.path.basename(main_script_path).replace('.', '_')}"
-                    main_module = load_script_module(main_script_path, main_module_name)
-                    if main_module:
-                        transformed_main_record = execute_hook(main_module, current_record)
-                        if transformed_main_record is not current_record:
-                            current_record = transformed_main_record
-                        state_record[f"main_{step_name}"] = dict(current_record)
-                    else:
-                        logger.error(f"Failed to load or execute main script for step '{step_name}'. This is critical. Record unchanged.")
-                        state_record[f"main_{step_name}"] = dict(current_record) # Log current state
-
-                # --- Handle Post-script ---
-                if step.get("post_script"):
-                    post_script_path = os.path.join(script_dir, step["post_script"])
-                    # CORRECTED BUG: Used post_script_path here, not pre_script_path
-                    post_module_name = f"post_{step_name}_module_{os.path.basename(post_script_path).replace('.', '_')}"
-                    post_module = load_script_module(post_script_path, post_module_name)
-                    if post_module:
-                        transformed_post_record = execute_hook(post_module, current_record)
-                        if transformed_post_record is not current_record:
-                            current_record = transformed_post_record
-                        state_record[f"post_{step_name}"] = dict(current_record)
-                    else:
-                        logger.warning(f"Failed to load or execute post-script for step '{step_name}'. Record unchanged.")
-                        state_record[f"post_{step_name}"] = dict(current_record) # Log current state
-
-                # Update the record for the next step, ensuring it's always a new dict
-                # This ensures each step works on a fresh copy of the record after previous transformations
-                # This line is redundant if current_record is updated in place, but good for clarity if changed
-                # record = current_record # Not needed since current_record holds the state for the next step
-            
-            # Record the final state transition for the record if enabled
-            if self.enable_state_log:
+        for state_record in results:
+            if "dead_letter" in state_record:
+                self.metrics["dead_lettered"] += 1
+            # Record the final state transition for each record if enabled
+            if self.enable_state_log and (self.state_log_level != "errors" or "dead_letter" in state_record):
                 record_state_transition(state_record)
-            
-            all_transitions.append(state_record) # Store the complete state history for this record
+            yield state_record
+        logger.info(f"Pipeline execution completed: {self.metrics}.")
+
+    def iter_resume(self, previous_results: Iterable[Dict[str, Any]], script_dir: str, start_step: int) -> Iterator[Dict[str, Any]]:
+        """
+        Continues the state histories of a previous run from start_step, reading them one window at a time,
+        so a resumed run holds no more histories in memory than a fresh one. Each record restarts from its
+        stored state after the step before start_step; records dead-lettered upstream are yielded unchanged.
+
+        Args:
+            previous_results (Iterable[Dict[str, Any]]): The state histories of the previous run, in order
+                                                         (e.g. from iter_results).
+            script_dir (str): The base directory where all pipeline scripts are located.
+            start_step (int): Position of the first step to execute.
+
+        Yields:
+            Dict[str, Any]: The state history of each record, in the order of previous_results.
+
+        Raises:
+            ValueError: If a history does not hold the state the record needs to resume from.
+        """
+        # Frame steps must see the whole batch, so the previous results are then read as a single window
+        chunk_size = None if self._has_frame_steps(start_step) else self.window_size
+        totals = {"records": 0, "unique_records": 0, "dedup_ratio": 0.0, "dead_lettered": 0}
+        kept = 0
+        previous_iter = iter(previous_results)
+        while True:
+            window = list(itertools.islice(previous_iter, chunk_size))
+            if not window:
+                break
+            seeds = [seed_state(result, self.pipeline_definition, start_step) for result in window]
+            resumed = self.iter_execute([seed[0] for seed in seeds if seed], script_dir, start_step,
+                                        [seed[1] for seed in seeds if seed])
+            for previous, seed in zip(window, seeds):
+                if seed:
+                    yield next(resumed)
+                else:
+                    kept += 1
+                    yield previous
+            next(resumed, None) # Let the window's run finish
+            for key in ("records", "unique_records", "dead_lettered"):
+                totals[key] += self.metrics[key]
+        self.metrics = totals
+        logger.info(f"Resumed {totals['records']} records from step {start_step}; "
+                    f"{kept} dead-lettered upstream were kept as they were.")
+
+    def _has_frame_steps(self, start_step: int) -> bool:
+        """
+        Checks whether any step from start_step on is a frame step.
+        """
+        return any(step.get("type") == "frame" for step in self.pipeline_definition.get("steps", [])[start_step:])
+
+    def _effective_window_size(self, count: int, start_step: int) -> int:
+        """
+        Returns the window size used for a dataset of count records. Frame steps must see the whole batch,
+        since column-wise results (e.g. a normalization by the maximum) depend on every record, so a pipeline
+        running frame steps processes the dataset as a single window regardless of window_size.
+        """
+        if not self._has_frame_steps(start_step):
+            return self.window_size
+        if count > self.window_size:
+            logger.warning(f"Frame steps see the whole batch, so all {count} records are held in memory at once "
+                           f"instead of windows of {self.window_size}. Use a smaller batch size to bound memory.")
+        return max(count, 1)
+
+    def _iter_windows(self, dataset: List[Dict[str, Any]], script_dir: str, start_step: int,
+                      initial_states: Optional[List[Dict[str, Any]]]) -> Iterator[Dict[str, Any]]:
+        """
+        Runs the dataset window by window and yields each record's state history in order.
+        """
+        window_size = self._effective_window_size(len(dataset), start_step)
+        logger.info(f"Processing {len(dataset)} records in windows of {window_size}.")
+        for start in range(0, len(dataset), window_size):
+            window_states = initial_states[start:start + window_size] if initial_states is not None else None
+            yield from self._execute_window(dataset[start:start + window_size], script_dir, start_step, window_states)
+
+    def _iter_deduplicated(self, dataset: List[Dict[str, Any]], script_dir: str, start_step: int) -> Iterator[Dict[str, Any]]:
+        """
+        Runs only the first occurrence of each distinct record and yields a history for every original position,
+        copying the first occurrence's history to its duplicates. Only histories that still have duplicates
+        ahead are kept in memory.
+        """
+        keys = [dedup_key(record, self.dedup_ignore_fields) for record in dataset]
+        remaining = Counter(keys)
+        seen = set()
+        unique_dataset = []
+        for record, key in zip(dataset, keys):
+            if key not in seen:
+                seen.add(key)
+                unique_dataset.append(record)
+        self.metrics["unique_records"] = len(unique_dataset)
+        self.metrics["dedup_ratio"] = round(1 - len(unique_dataset) / len(dataset), 4) if dataset else 0.0
+        logger.info(f"Deduplicated {len(dataset)} records to {len(unique_dataset)} unique records.")
+
+        unique_results = self._iter_windows(unique_dataset, script_dir, start_step, None)
+        pending: Dict[str, Dict[str, Any]] = {} # Histories of first occurrences whose duplicates are still ahead
+        for record, key in zip(dataset, keys):
+            if key in pending:
+                result = fan_out(pending[key], record, self.dedup_ignore_fields)
+            else:
+                # First occurrences are processed in dataset order, so the next unique history belongs to this record
+                result = next(unique_results)
+                pending[key] = result
+            remaining[key] -= 1
+            if remaining[key] == 0:
+                del pending[key]
+            yield result
+
+    def _execute_window(self, dataset: List[Dict[str, Any]], script_dir: str, start_step: int,
+                        initial_states: Optional[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """
+        Runs every step from start_step over one window of records.
+
+        Args:
+            dataset (List[Dict[str, Any]]): The records of the window.
+            script_dir (str): The base directory where all pipeline scripts are located.
+            start_step (int): Position of the first step to execute.
+            initial_states (Optional[List[Dict[str, Any]]]): State histories to continue, one per record.
+
+        Returns:
+            List[Dict[str, Any]]: The state history of each record in the window.
+        """
+        # Steps run one after another over the whole window so that 'frame' steps can see every record at once
+        current_records: Optional[List[Dict[str, Any]]] = [dict(record) for record in dataset] # Copies avoid modifying original dataset
+        if initial_states is not None:
+            state_records: List[Dict[str, Any]] = [dict(state) for state in initial_states]
+        else:
+            state_records = [{"raw": dict(record)} for record in dataset] # Store raw for logging
+        # Positions of the records still being processed; dead-lettered records drop out of later steps
+        active: List[int] = list(range(len(dataset)))
+        # Records whose every stage is snapshotted; the others only keep their final state
+        traced = self._traced_records(len(dataset))
+        # Columnar form of the batch, kept alive across consecutive frame stages so it is only converted when needed
+        frame: Any = None
+        frame_format = ""
+        frame_source: Optional[List[Dict[str, Any]]] = None # Records the frame was built from, to restore their keys
+
+        for step in self.pipeline_definition.get("steps", [])[start_step:]:
+            step_name = step.get("name", "unnamed_step")
+            step_type = step.get("type", "record")
+            retry_policy = self._retry_policy(step)
+            timeout = self._hook_timeout(step)
+            # A fresh copy per attempt keeps a failed or timed-out attempt from changing what the next one sees
+            copy_input = retry_policy.max_attempts > 1 or timeout is not None
+            logger.debug(f"Executing {step_type} step '{step_name}' for {len(active)} records")
+
+            for stage in STAGES:
+                if not step.get(f"{stage}_script") or not active:
+                    continue
+                module = self._load_stage_module(step, stage, script_dir)
 
-        logger.info("Pipeline execution completed."+state_record)
-        return all_transitions
+                if step_type == "frame":
+                    step_frame_format = step.get("frame_format", "pandas")
+                    if frame is None or frame_format != step_frame_format:
+                        if current_records is None:
+                            current_records = frame_to_records(frame, frame_format, frame_source)
+                        frame = records_to_frame(current_records, step_frame_format)
+                        frame_format, frame_source = step_frame_format, current_records
+                    try:
+                        frame = retry_policy.call(self._call_frame_hook, module, frame, frame_format, copy_input, timeout)
+                    except HookRetryError as e:
+                        # A frame hook sees the whole batch, so every remaining record shares its failure
+                        for index in active:
+                            self._dead_letter(state_records[index], step_name, stage, e)
+                        active, current_records, frame = [], [], None
+                        continue
+                    current_records = None # Stale until the frame is converted back
+                else:
+                    if current_records is None:
+                        current_records = frame_to_records(frame, frame_format, frame_source)
+                    frame = None # Record hooks may change records, so any cached frame is stale
+                    next_active, next_records = [], []
+                    for index, record in zip(active, current_records):
+                        try:
+                            next_records.append(retry_policy.call(self._call_record_hook, module, record, copy_input, timeout))
+                            next_active.append(index)
+                        except HookRetryError as e:
+                            self._dead_letter(state_records[index], step_name, stage, e)
+                    active, current_records = next_active, next_records
 
+                # The state log is per record, so frames are converted back only when a record is traced
+                if any(traced[index] for index in active):
+                    if current_records is None:
+                        current_records = frame_to_records(frame, frame_format, frame_source)
+                    for index, record in zip(active, current_records):
+                        if traced[index]:
+                            state_records[index][f"{stage}_{step_name}"] = dict(record)
+
+        if current_records is None:
+            current_records = frame_to_records(frame, frame_format, frame_source)
+        for index, record in zip(active, current_records):
+            if not traced[index]:
+                state_records[index]["final"] = record # No further hooks run, so no copy is needed
+
+        return state_records
+
+    def close(self):
+        """
+        Releases the pooled clients held by the hook context.
+        """
+        self.context.close()
+
+    def _traced_records(self, count: int) -> List[bool]:
+        """
+        Decides, for each record position, whether every stage is snapshotted.
+
+        Args:
+            count (int): The number of records in the dataset.
+
+        Returns:
+            List[bool]: True for the records traced at every stage.
+        """
+        if self.state_log_level == "full":
+            return [True] * count
+        if self.state_log_level == "sampled":
+            return [random.random() * 100 < self.state_log_sample_rate for _ in range(count)]
+        return [False] * count
+
+    def _retry_policy(self, step: Dict[str, Any]) -> RetryPolicy:
+        """
+        Returns the retry policy of a step, falling back to the pipeline-wide "retry" block.
+
+        Args:
+            step (Dict[str, Any]): The step definition from the pipeline definition.
+
+        Returns:
+            RetryPolicy: The policy used for every hook of the step.
+        """
+        return RetryPolicy.from_config(step.get("retry", self.pipeline_definition.get("retry")))
+
+    def _hook_timeout(self, step: Dict[str, Any]) -> Optional[float]:
+        """
+        Returns the timeout of a step's hook calls, falling back to the pipeline-wide "timeout".
+
+        Args:
+            step (Dict[str, Any]): The step definition from the pipeline definition.
+
+        Returns:
+            Optional[float]: The timeout in seconds, or None if hook calls may take as long as they need.
+
+        Raises:
+            ValueError: If the timeout is not a positive number.
+        """
+        timeout = step.get("timeout", self.pipeline_definition.get("timeout"))
+        if timeout is None:
+            return None
+        if isinstance(timeout, bool) or not isinstance(timeout, (int, float)) or timeout <= 0:
+            raise ValueError(f"Invalid timeout {timeout!r} for step '{step.get('name')}'. Expected a positive number of seconds.")
+        return float(timeout)
+
+    def _call_record_hook(self, module: Optional[ModuleType], record: Dict[str, Any], copy_input: bool,
+                          timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Runs a record hook once, raising its exceptions (and HookTimeoutError after timeout seconds)
+        so the retry policy can handle them.
+        With copy_input, each attempt gets a fresh copy so a failed attempt's changes are not retried on.
+        """
+        return call_with_timeout(timeout, execute_hook, module, dict(record) if copy_input else record,
+                                 self.context, raise_errors=True)
+
+    def _call_frame_hook(self, module: Optional[ModuleType], frame: Any, frame_format: str, copy_input: bool,
+                         timeout: Optional[float] = None) -> Any:
+        """
+        Runs a frame hook once, raising its exceptions (and HookTimeoutError after timeout seconds)
+        so the retry policy can handle them.
+        With copy_input, each attempt gets a fresh copy so a failed attempt's changes are not retried on.
+        """
+        return call_with_timeout(timeout, execute_frame_hook, module, copy_frame(frame, frame_format) if copy_input else frame,
+                                 frame_format, self.context, raise_errors=True)
+
+    @staticmethod
+    def _dead_letter(state_record: Dict[str, Any], step_name: str, stage: str, error: HookRetryError):
+        """
+        Marks a record as dead-lettered after its retries were exhausted.
+        The record keeps the snapshots of the stages it completed.
+        """
+        logger.error(f"Record dead-lettered at {stage} stage of step '{step_name}': {error}")
+        state_record["dead_letter"] = {
+            "step": step_name,
+            "stage": stage,
+            "attempts": error.attempts,
+            "error": f"{type(error.error).__name__}: {error.error}",
+        }
+
+    def _load_stage_module(self, step: Dict[str, Any], stage: str, script_dir: str) -> Optional[ModuleType]:
+        """
+        Loads the pre, main or post script of a step as a module.
+
+        Args:
+            step (Dict[str, Any]): The step definition from the pipeline definition.
+            stage (str): One of "pre", "main" or "post".
+            script_dir (str): The base directory where all pipeline scripts are located.
+
+        Returns:
+            Optional[ModuleType]: The loaded module, or None if loading failed.
+        """
+        step_name = step.get("name", "unnamed_step")
+        script_path = os.path.join(script_dir, step[f"{stage}_script"])
+        # Generate a unique module name for this specific hook and step
+        module_name = f"{stage}_{step_name}_module_{os.path.basename(script_path).replace('.', '_')}"
+        module = load_script_module(script_path, module_name)
+        if module is None:
+            if stage == "main":
+                logger.error(f"Failed to load main script for step '{step_name}'. This is critical. Records unchanged.")
+            else:
+                logger.warning(f"Failed to load {stage}-script for step '{step_name}'. Records unchanged.")
+        return module
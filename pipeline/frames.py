@@ -0,0 +1,139 @@
+import logging
+from typing import Dict, List, Any, Optional
+
+# Set up logging for this module
+logger = logging.getLogger(__name__)
+
+# Supported in-memory representations handed to 'transform_frame' hooks
+FRAME_FORMATS = ("pandas", "numpy")
+
+
+def records_to_frame(records: List[Dict[str, Any]], frame_format: str = "pandas") -> Any:
+    """
+    Converts a list of records into a columnar frame for a 'frame' step.
+
+    Args:
+        records (List[Dict[str, Any]]): The records of the current batch.
+        frame_format (str): "pandas" for a pandas DataFrame, or "numpy" for a
+                            dictionary mapping each column name to a NumPy array.
+
+    Returns:
+        Any: The columnar representation of the records.
+
+    Raises:
+        ValueError: If the frame format is not supported.
+        ImportError: If the library required by the frame format is not installed.
+    """
+    if frame_format == "pandas":
+        import pandas as pd
+        frame = pd.DataFrame.from_records(records)
+        for column in frame.columns:
+            # A missing or None value would turn an integer column into floats; nullable integers keep them exact
+            values = [record.get(column) for record in records]
+            present = [v for v in values if v is not None]
+            if len(present) < len(values) and present and all(isinstance(v, int) and not isinstance(v, bool) for v in present):
+                # Built from the records, since the float column may already have rounded integers above 2**53
+                frame[column] = pd.array(values, dtype="Int64")
+        return frame
+    if frame_format == "numpy":
+        import numpy as np
+        columns: Dict[str, None] = {}
+        for record in records:
+            columns.update(dict.fromkeys(record))
+        return {column: np.asarray([record.get(column) for record in records]) for column in columns}
+    raise ValueError(f"Unsupported frame format: {frame_format}")
+
+
+def _to_builtin(value: Any) -> Any:
+    """
+    Converts a frame cell to a JSON-serializable Python value: NumPy scalars to Python scalars,
+    NaN, NA and NaT to None, and timestamps to ISO strings. Values keep their full precision.
+    """
+    import numpy as np
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, (list, tuple, dict, set)):
+        return value
+    try:
+        import pandas as pd
+        if pd.isna(value):
+            return None
+        if isinstance(value, pd.Timestamp):
+            return value.isoformat()
+    except ImportError:
+        if isinstance(value, float) and value != value:
+            return None
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def frame_to_records(frame: Any, frame_format: str = "pandas",
+                     source_records: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+    """
+    Converts a columnar frame back into a list of JSON-serializable records.
+
+    Args:
+        frame (Any): A pandas DataFrame or a dictionary of NumPy arrays.
+        frame_format (str): The format the frame was created with.
+        source_records (Optional[List[Dict[str, Any]]]): The records the frame was built from. A key a record
+                                                          did not have, but another record did, is left out of
+                                                          its row again unless the hook filled it in.
+
+    Returns:
+        List[Dict[str, Any]]: One dictionary per row, with NumPy scalars converted to Python types.
+    """
+    if frame_format == "pandas":
+        rows = frame.to_dict(orient="records")
+    elif frame_format == "numpy":
+        columns = {column: list(values) for column, values in frame.items()}
+        rows = [dict(zip(columns.keys(), row)) for row in zip(*columns.values())]
+    else:
+        raise ValueError(f"Unsupported frame format: {frame_format}")
+
+    records = [{key: _to_builtin(value) for key, value in row.items()} for row in rows]
+    if source_records is not None:
+        source_columns = set().union(*source_records) if source_records else set()
+        for record, source in zip(records, source_records):
+            for key in source_columns.difference(source):
+                if key in record and record[key] is None:
+                    del record[key]
+    return records
+
+
+def copy_frame(frame: Any, frame_format: str = "pandas") -> Any:
+    """
+    Returns a copy of a frame, so a retried hook does not see changes made by a failed attempt.
+
+    Args:
+        frame (Any): A pandas DataFrame or a dictionary of NumPy arrays.
+        frame_format (str): The format of the frame.
+
+    Returns:
+        Any: The copied frame.
+    """
+    if frame_format == "numpy":
+        return {column: values.copy() for column, values in frame.items()}
+    return frame.copy()
+
+
+def frame_length(frame: Any, frame_format: str = "pandas") -> int:
+    """
+    Returns the number of rows in a frame, or -1 if the object is not a valid frame of the given format.
+
+    Args:
+        frame (Any): The object returned by a 'transform_frame' hook.
+        frame_format (str): The expected frame format.
+
+    Returns:
+        int: The number of rows, or -1 if the frame is invalid.
+    """
+    if frame_format == "pandas":
+        import pandas as pd
+        return len(frame) if isinstance(frame, pd.DataFrame) else -1
+    if frame_format == "numpy":
+        if not isinstance(frame, dict):
+            return -1
+        lengths = {len(values) for values in frame.values()}
+        return lengths.pop() if len(lengths) == 1 else (0 if not lengths else -1)
+    return -1
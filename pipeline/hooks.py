@@ -1,9 +1,13 @@
 import importlib.util
+import inspect
 import logging
 import sys
 import os
+import threading
 from types import ModuleType
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Callable, Optional
+
+from .frames import frame_length
 
 # Set up logging for this module
 logger = logging.getLogger(__name__)
@@ -11,6 +15,69 @@ logger = logging.getLogger(__name__)
 # A cache for loaded modules to avoid re-loading the same script multiple times
 _module_cache: Dict[str, ModuleType] = {}
 
+class HookTimeoutError(TimeoutError):
+    """
+    Raised when a hook call does not return within its step's timeout.
+    """
+    def __init__(self, timeout: float):
+        super().__init__(f"Hook did not finish within {timeout}s")
+        self.timeout = timeout
+
+def call_with_timeout(timeout: Optional[float], fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Calls fn in a worker thread and waits at most timeout seconds for it.
+    Python threads cannot be killed, so a timed-out call keeps running in the background as a daemon
+    thread and its result is discarded; callers must not pass it objects they keep using.
+
+    Args:
+        timeout (Optional[float]): The deadline in seconds. None calls fn directly, without a thread.
+        fn (Callable[..., Any]): The function to call.
+        *args, **kwargs: Arguments passed to fn.
+
+    Returns:
+        Any: The result of fn.
+
+    Raises:
+        HookTimeoutError: If fn did not return in time.
+    """
+    if timeout is None:
+        return fn(*args, **kwargs)
+    outcome: Dict[str, Any] = {}
+
+    def run():
+        try:
+            outcome["result"] = fn(*args, **kwargs)
+        except BaseException as e:
+            outcome["error"] = e
+
+    worker = threading.Thread(target=run, name="hook-call", daemon=True)
+    worker.start()
+    worker.join(timeout)
+    if worker.is_alive():
+        raise HookTimeoutError(timeout)
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["result"]
+
+def _accepts_context(func: Any) -> bool:
+    """
+    Checks whether a hook function takes a second positional 'context' argument.
+
+    Args:
+        func (Any): The hook's 'transform' or 'transform_frame' function.
+
+    Returns:
+        bool: True if the hook should be called with the HookContext.
+    """
+    try:
+        parameters = inspect.signature(func).parameters.values()
+    except (TypeError, ValueError):
+        return False
+    if any(p.kind == p.VAR_POSITIONAL for p in parameters):
+        return True
+    positional = [p for p in parameters if p.kind in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD)]
+    return len(positional) >= 2
+
 def load_script_module(script_path: str, module_name: str) -> Optional[ModuleType]:
     """
     Dynamically loads a Python script as a module.
@@ -54,7 +121,8 @@ def load_script_module(script_path: str, module_name: str) -> Optional[ModuleTyp
         logger.error(f"Error loading script '{script_path}' as module '{module_name}': {e}", exc_info=True)
         return None
 
-def execute_hook(module: Optional[ModuleType], record: Dict[str, Any]) -> Dict[str, Any]:
+def execute_hook(module: Optional[ModuleType], record: Dict[str, Any], context: Any = None,
+                 raise_errors: bool = False) -> Dict[str, Any]:
     """
     Executes the 'transform' function within a loaded module, if it exists.
     If the module is None or 'transform' function is not found, returns the record unchanged.
@@ -62,9 +130,16 @@ def execute_hook(module: Optional[ModuleType], record: Dict[str, Any]) -> Dict[s
     Args:
         module (Optional[ModuleType]): The loaded Python module object.
         record (Dict[str, Any]): The data record to be transformed.
+        context (Any): The HookContext, passed as a second argument if 'transform' accepts one.
+        raise_errors (bool): If True, exceptions raised by 'transform', and a return value that is not a
+                             dictionary, are raised so a retry policy can handle them.
 
     Returns:
         Dict[str, Any]: The transformed record, or the original record if transformation fails or is not applicable.
+
+    Raises:
+        ValueError: With raise_errors, if the hook did not return a dictionary. The hook may have changed the
+                    record in place, so it cannot be passed on instead.
     """
     if module is None:
         logger.debug("No module provided for hook execution. Returning record unchanged.")
@@ -73,13 +148,18 @@ def execute_hook(module: Optional[ModuleType], record: Dict[str, Any]) -> Dict[s
     if hasattr(module, 'transform'):
         try:
             # Ensure the transform function accepts and returns a dictionary
-            transformed_record = module.transform(record)
+            if context is not None and _accepts_context(module.transform):
+                transformed_record = module.transform(record, context)
+            else:
+                transformed_record = module.transform(record)
             if not isinstance(transformed_record, dict):
-                logger.warning(f"Hook '{module.__name__}' 'transform' function did not return a dictionary. Returning original record.")
-                return record
+                raise ValueError(f"Hook '{module.__name__}' 'transform' function did not return a dictionary "
+                                 f"(got {type(transformed_record).__name__}).")
             logger.debug(f"Successfully applied transform from hook: {module.__name__}")
             return transformed_record
         except Exception as e:
+            if raise_errors:
+                raise
             logger.error(f"Error executing 'transform' function in hook '{module.__name__}': {e}", exc_info=True)
             # Return original record on transformation error
             return record
@@ -87,3 +167,60 @@ def execute_hook(module: Optional[ModuleType], record: Dict[str, Any]) -> Dict[s
         logger.warning(f"No 'transform' function found in module '{module.__name__}'. Returning record unchanged.")
         return record
 
+
+def execute_frame_hook(module: Optional[ModuleType], frame: Any, frame_format: str = "pandas", context: Any = None,
+                       raise_errors: bool = False) -> Any:
+    """
+    Executes the 'transform_frame' function within a loaded module, if it exists.
+    The function receives the whole batch as a frame and must return a frame with the same number of rows.
+    Rows are matched back to their records by position: a pandas frame whose rows were reordered (e.g. by
+    sort_values) is put back in the input's index order, and numpy hooks must keep the row order themselves.
+    If the module is None or 'transform_frame' function is not found, returns the frame unchanged.
+
+    Args:
+        module (Optional[ModuleType]): The loaded Python module object.
+        frame (Any): The batch as a pandas DataFrame or a dictionary of NumPy arrays.
+        frame_format (str): The format of the frame, "pandas" or "numpy".
+        context (Any): The HookContext, passed as a second argument if 'transform_frame' accepts one.
+        raise_errors (bool): If True, exceptions raised by 'transform_frame', and a returned frame of the wrong
+                             shape, are raised so a retry policy can handle them.
+
+    Returns:
+        Any: The transformed frame, or the original frame if transformation fails or is not applicable.
+
+    Raises:
+        ValueError: With raise_errors, if the hook did not return a frame of the same format and number of rows,
+                    or a pandas frame whose index is not a reordering of the input's.
+                    The hook may have changed the input frame in place, so it cannot be used instead.
+    """
+    if module is None:
+        logger.debug("No module provided for frame hook execution. Returning frame unchanged.")
+        return frame
+
+    if hasattr(module, 'transform_frame'):
+        try:
+            original_index = frame.index.copy() if frame_format == "pandas" else None # The hook may change it in place
+            if context is not None and _accepts_context(module.transform_frame):
+                transformed_frame = module.transform_frame(frame, context)
+            else:
+                transformed_frame = module.transform_frame(frame)
+            if frame_length(transformed_frame, frame_format) != frame_length(frame, frame_format):
+                raise ValueError(f"Hook '{module.__name__}' 'transform_frame' function did not return a {frame_format} "
+                                 f"frame with the same number of rows ({frame_length(frame, frame_format)}).")
+            if original_index is not None and not transformed_frame.index.equals(original_index):
+                # Same rows in another order can be restored; other index changes lose the link to the records
+                if not (transformed_frame.index.is_unique and original_index.isin(transformed_frame.index).all()):
+                    raise ValueError(f"Hook '{module.__name__}' 'transform_frame' function returned a frame with a "
+                                     "different index, so its rows cannot be matched back to their records.")
+                transformed_frame = transformed_frame.reindex(original_index)
+            logger.debug(f"Successfully applied transform_frame from hook: {module.__name__}")
+            return transformed_frame
+        except Exception as e:
+            if raise_errors:
+                raise
+            logger.error(f"Error executing 'transform_frame' function in hook '{module.__name__}': {e}", exc_info=True)
+            # Return original frame on transformation error
+            return frame
+    else:
+        logger.warning(f"No 'transform_frame' function found in module '{module.__name__}'. Returning frame unchanged.")
+        return frame
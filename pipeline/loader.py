@@ -3,12 +3,14 @@ import os
 import logging
 from typing import Dict, List, Any
 
+from .compression import open_text
+
 # Set up logging for this module
 logger = logging.getLogger(__name__)
 
 def load_pipeline_definition(pipeline_path: str) -> Dict[str, Any]:
     """
-    Loads a pipeline definition from a specified JSON file.
+    Loads a pipeline definition from a specified JSON file, which may be gzip or zstd compressed (.gz, .zst).
 
     Args:
         pipeline_path (str): The path to the JSON file containing the pipeline definition.
@@ -26,7 +28,7 @@ def load_pipeline_definition(pipeline_path: str) -> Dict[str, Any]:
         raise FileNotFoundError(f"Pipeline definition file not found: {pipeline_path}")
     
     try:
-        with open(pipeline_path, 'r', encoding='utf-8') as f:
+        with open_text(pipeline_path, 'r') as f:
             pipeline_def = json.load(f)
         logger.info(f"Successfully loaded pipeline definition from: {pipeline_path}")
         return pipeline_def
@@ -40,7 +42,7 @@ def load_pipeline_definition(pipeline_path: str) -> Dict[str, Any]:
 def load_dataset(dataset_path: str) -> List[Dict[str, Any]]:
     """
     Loads a dataset from a specified JSON file.
-    Assumes the dataset is a JSON array of objects.
+    Assumes the dataset is a JSON array of objects. Files ending in .gz or .zst are decompressed transparently.
 
     Args:
         dataset_path (str): The path to the JSON file containing the dataset.
@@ -58,7 +60,7 @@ def load_dataset(dataset_path: str) -> List[Dict[str, Any]]:
         raise FileNotFoundError(f"Dataset file not found: {dataset_path}")
 
     try:
-        with open(dataset_path, 'r', encoding='utf-8') as f:
+        with open_text(dataset_path, 'r') as f:
             dataset = json.load(f)
         if not isinstance(dataset, list):
             logger.warning(f"Dataset file '{dataset_path}' did not load as a list. Assuming a single record.")
@@ -0,0 +1,94 @@
+import json
+import os
+import logging
+from typing import Dict, Any, Iterator, Optional
+
+from .compression import compression_of, strip_compression_extension, open_text
+
+# Set up logging for this module
+logger = logging.getLogger(__name__)
+
+
+class ResultsWriter:
+    """
+    Streams state records to a results file as they are produced, so results never have to be
+    held in memory all at once and a crash keeps everything written so far.
+    A '.jsonl' path gets one JSON object per line; any other path gets a JSON array written item by item.
+    A '.gz' or '.zst' path is compressed. A compressed stream cannot be read before it is closed, so it is
+    written under a '.partial' name and moved into place on a clean exit; readers never see a truncated stream.
+    If the run raises, the '.partial' file is left in place and an existing output is kept.
+    """
+    def __init__(self, output_path: str, json_lines: Optional[bool] = None, compression: Optional[str] = None):
+        """
+        Initializes the ResultsWriter.
+
+        Args:
+            output_path (str): Path to the results file. Its directory is created if needed.
+            json_lines (Optional[bool]): Forces JSONL (True) or a JSON array (False) regardless of the extension.
+            compression (Optional[str]): Forces "gzip" or "zstd" compression regardless of the extension,
+                                         e.g. for a temporary file name.
+        """
+        self.output_path = output_path
+        self.json_lines = strip_compression_extension(output_path).endswith(".jsonl") if json_lines is None else json_lines
+        self.compression = compression or compression_of(output_path)
+        self._write_path = f"{output_path}.partial" if self.compression else output_path
+        self.count = 0
+        self._file = None
+
+    def __enter__(self) -> "ResultsWriter":
+        output_directory = os.path.dirname(self.output_path)
+        if output_directory: # Only try to create if output_path is not just a filename
+            os.makedirs(output_directory, exist_ok=True)
+        self._file = open_text(self._write_path, 'w', compression=self.compression)
+        if not self.json_lines:
+            self._file.write("[")
+        return self
+
+    def write(self, result: Dict[str, Any]):
+        """
+        Appends one state record to the results file.
+
+        Args:
+            result (Dict[str, Any]): The state history of a record.
+        """
+        if self.json_lines:
+            self._file.write(json.dumps(result) + "\n")
+        else:
+            self._file.write(("\n" if self.count == 0 else ",\n") + json.dumps(result))
+        self.count += 1
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if not self.json_lines:
+            self._file.write("\n]\n")
+        self._file.close()
+        self._file = None
+        if self._write_path != self.output_path and exc_type is None:
+            os.replace(self._write_path, self.output_path)
+
+
+def iter_results(results_path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Reads the state records of a results file written by ResultsWriter.
+    JSONL files are read line by line; JSON arrays are loaded as a whole. Files ending in .gz or .zst are decompressed.
+
+    Args:
+        results_path (str): Path to the results file.
+
+    Yields:
+        Dict[str, Any]: Each state record, in order.
+
+    Raises:
+        FileNotFoundError: If the results file does not exist.
+        json.JSONDecodeError: If the file content is not valid JSON.
+    """
+    if not os.path.exists(results_path):
+        logger.error(f"Results file not found: {results_path}")
+        raise FileNotFoundError(f"Results file not found: {results_path}")
+
+    with open_text(results_path, 'r') as f:
+        if strip_compression_extension(results_path).endswith(".jsonl"):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from json.load(f)
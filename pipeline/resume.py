@@ -0,0 +1,189 @@
+import hashlib
+import json
+import os
+import logging
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple, Union
+
+from .compression import strip_compression_extension
+
+# Set up logging for this module
+logger = logging.getLogger(__name__)
+
+# Hook stages of a step, latest first: the last snapshot a step produced is its output
+_STAGES_LATEST_FIRST = ("post", "main", "pre")
+
+
+def default_manifest_path(output_path: str) -> str:
+    """
+    Derives the run manifest path from a results file path,
+    e.g. 'results/batch_0.json' -> 'results/batch_0.manifest.json'.
+
+    Args:
+        output_path (str): The path of the results file.
+
+    Returns:
+        str: The path of the manifest file.
+    """
+    root, _ = os.path.splitext(strip_compression_extension(output_path))
+    return f"{root}.manifest.json"
+
+
+def script_hashes(pipeline_definition: Dict[str, Any], script_dir: str) -> List[Dict[str, Any]]:
+    """
+    Computes the SHA-256 of every script of every step.
+
+    Args:
+        pipeline_definition (Dict[str, Any]): The pipeline definition.
+        script_dir (str): The base directory where all pipeline scripts are located.
+
+    Returns:
+        List[Dict[str, Any]]: One {"name": ..., "scripts": {"pre": hash, "main": hash, "post": hash}} per step,
+                              with None for scripts that are not defined or not found.
+    """
+    hashes = []
+    for step in pipeline_definition.get("steps", []):
+        scripts = {}
+        for stage in ("pre", "main", "post"):
+            script_path = os.path.join(script_dir, step[f"{stage}_script"]) if step.get(f"{stage}_script") else None
+            if script_path and os.path.exists(script_path):
+                with open(script_path, "rb") as f:
+                    scripts[stage] = hashlib.sha256(f.read()).hexdigest()
+            else:
+                scripts[stage] = None
+        hashes.append({"name": step.get("name", "unnamed_step"), "scripts": scripts})
+    return hashes
+
+
+def write_manifest(manifest_path: str, pipeline_definition: Dict[str, Any], script_dir: str,
+                   metrics: Optional[Dict[str, Any]] = None):
+    """
+    Writes the run manifest: the script hashes of every step and the run metrics.
+    A later run resuming from these results uses it to verify that upstream steps are unchanged.
+
+    Args:
+        manifest_path (str): The path of the manifest file.
+        pipeline_definition (Dict[str, Any]): The pipeline definition of the run.
+        script_dir (str): The base directory where all pipeline scripts are located.
+        metrics (Optional[Dict[str, Any]]): Run metrics to record alongside the hashes.
+    """
+    manifest_directory = os.path.dirname(manifest_path)
+    if manifest_directory:
+        os.makedirs(manifest_directory, exist_ok=True)
+    manifest = {
+        "timestamp": datetime.utcnow().isoformat(),
+        "pipeline": pipeline_definition.get("name"),
+        "steps": script_hashes(pipeline_definition, script_dir),
+        "metrics": metrics or {},
+    }
+    with open(manifest_path, "w", encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    logger.info(f"Run manifest saved to: {manifest_path}")
+
+
+def load_manifest(manifest_path: str) -> Dict[str, Any]:
+    """
+    Loads a run manifest written by write_manifest.
+
+    Args:
+        manifest_path (str): The path of the manifest file.
+
+    Returns:
+        Dict[str, Any]: The manifest.
+
+    Raises:
+        FileNotFoundError: If the manifest does not exist.
+        json.JSONDecodeError: If the file content is not valid JSON.
+    """
+    if not os.path.exists(manifest_path):
+        logger.error(f"Run manifest not found: {manifest_path}")
+        raise FileNotFoundError(f"Run manifest not found: {manifest_path}")
+    with open(manifest_path, "r", encoding='utf-8') as f:
+        return json.load(f)
+
+
+def resolve_step_index(pipeline_definition: Dict[str, Any], step: Union[str, int]) -> int:
+    """
+    Resolves a step given by name or by 0-based position.
+
+    Args:
+        pipeline_definition (Dict[str, Any]): The pipeline definition.
+        step (Union[str, int]): The step name, or its position.
+
+    Returns:
+        int: The position of the step.
+
+    Raises:
+        ValueError: If no such step exists.
+    """
+    steps = pipeline_definition.get("steps", [])
+    names = [s.get("name", "unnamed_step") for s in steps]
+    if step in names:
+        return names.index(step)
+    if isinstance(step, int) or str(step).isdigit():
+        if 0 <= int(step) < len(steps):
+            return int(step)
+    raise ValueError(f"Cannot resume from step '{step}'. Expected one of {names} or a position below {len(steps)}.")
+
+
+def verify_upstream_scripts(manifest: Dict[str, Any], current_hashes: List[Dict[str, Any]], start_step: int):
+    """
+    Checks that every step before start_step has the same name and scripts as in the previous run.
+
+    Args:
+        manifest (Dict[str, Any]): The manifest of the previous run.
+        current_hashes (List[Dict[str, Any]]): The script hashes of the current pipeline.
+        start_step (int): The position of the first step to execute.
+
+    Raises:
+        ValueError: If an upstream step changed, so its stored states cannot be reused.
+    """
+    previous_hashes = manifest.get("steps", [])
+    for position in range(start_step):
+        current = current_hashes[position]
+        previous = previous_hashes[position] if position < len(previous_hashes) else None
+        if previous != current:
+            raise ValueError(f"Step '{current['name']}' changed since the previous run "
+                             f"(previous: {previous}, current: {current}). Cannot resume after it.")
+    logger.info(f"Verified script hashes of {start_step} upstream step(s).")
+
+
+def seed_state(result: Dict[str, Any], pipeline_definition: Dict[str, Any],
+               start_step: int) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """
+    Builds the starting point of a record for a run resuming at start_step from its previous state history.
+
+    Args:
+        result (Dict[str, Any]): The record's state history from the previous run.
+        pipeline_definition (Dict[str, Any]): The pipeline definition.
+        start_step (int): The position of the first step to execute.
+
+    Returns:
+        Optional[Tuple[Dict[str, Any], Dict[str, Any]]]: The record as it left the step before start_step and the
+                                                          history up to that step, or None if the record was
+                                                          dead-lettered upstream, or outside any step (e.g. its
+                                                          batch timed out), and must be kept as it is.
+
+    Raises:
+        ValueError: If the history does not hold the intermediate state (e.g. it was not fully traced).
+    """
+    steps = pipeline_definition.get("steps", [])
+    step_names = [step.get("name", "unnamed_step") for step in steps]
+    dead_letter = result.get("dead_letter")
+    if dead_letter and (dead_letter.get("step") is None or dead_letter.get("step") in step_names[:start_step]):
+        return None
+
+    upstream_keys = {f"{stage}_{name}" for name in step_names[:start_step] for stage in _STAGES_LATEST_FIRST}
+    initial_state = {key: value for key, value in result.items() if key == "raw" or key in upstream_keys}
+    if start_step == 0:
+        return dict(result["raw"]), initial_state
+
+    previous_step = steps[start_step - 1]
+    for stage in _STAGES_LATEST_FIRST:
+        key = f"{stage}_{step_names[start_step - 1]}"
+        if previous_step.get(f"{stage}_script") and key in result:
+            return dict(result[key]), initial_state
+    if dead_letter:
+        return None # Dead-lettered before reaching the step it would resume after
+    raise ValueError(f"Previous results hold no state for step '{step_names[start_step - 1]}' of record {result.get('raw')}. "
+                     "Resuming needs results written with the 'full' state log level.")
@@ -0,0 +1,102 @@
+import random
+import time
+import logging
+from typing import Dict, Any, Callable, Optional
+
+# Set up logging for this module
+logger = logging.getLogger(__name__)
+
+
+class HookRetryError(Exception):
+    """
+    Raised when a hook keeps failing after every attempt allowed by its retry policy.
+    The last underlying exception is available as __cause__.
+    """
+    def __init__(self, attempts: int, error: Exception):
+        super().__init__(f"Hook failed after {attempts} attempt(s): {error}")
+        self.attempts = attempts
+        self.error = error
+
+
+class RetryPolicy:
+    """
+    Retries a hook call with exponential backoff and full jitter.
+    """
+    def __init__(self, max_attempts: int = 1, backoff_base: float = 0.5, backoff_max: float = 30.0, jitter: bool = True):
+        """
+        Initializes the RetryPolicy.
+
+        Args:
+            max_attempts (int): Total number of attempts, including the first call. 1 disables retries.
+            backoff_base (float): Delay in seconds before the first retry; doubled for every further retry.
+            backoff_max (float): Upper bound for a single delay in seconds.
+            jitter (bool): If True, each delay is drawn uniformly between 0 and the backoff delay.
+        """
+        if max_attempts < 1:
+            raise ValueError("Retry policy max_attempts must be at least 1.")
+        if backoff_base < 0 or backoff_max < 0:
+            raise ValueError("Retry policy backoff values must not be negative.")
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.jitter = jitter
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]]) -> "RetryPolicy":
+        """
+        Builds a policy from a "retry" block of the pipeline definition.
+
+        Args:
+            config (Optional[Dict[str, Any]]): e.g. {"max_attempts": 3, "backoff_base": 1, "backoff_max": 20, "jitter": true}.
+                                               None means a single attempt.
+
+        Returns:
+            RetryPolicy: The configured policy.
+        """
+        if not config:
+            return cls()
+        if not isinstance(config, dict):
+            raise ValueError(f"Invalid retry configuration: {config}. Expected a dictionary.")
+        return cls(
+            max_attempts=int(config.get("max_attempts", 1)),
+            backoff_base=float(config.get("backoff_base", 0.5)),
+            backoff_max=float(config.get("backoff_max", 30.0)),
+            jitter=bool(config.get("jitter", True)),
+        )
+
+    def delay(self, attempt: int) -> float:
+        """
+        Returns the delay to wait after a failed attempt.
+
+        Args:
+            attempt (int): The number of the attempt that just failed, starting at 1.
+
+        Returns:
+            float: The delay in seconds.
+        """
+        delay = min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1)))
+        return random.uniform(0, delay) if self.jitter else delay
+
+    def call(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Calls fn until it succeeds or the attempts are exhausted.
+
+        Args:
+            fn (Callable[..., Any]): The function to call.
+            *args, **kwargs: Arguments passed to fn on every attempt.
+
+        Returns:
+            Any: The result of the first successful call.
+
+        Raises:
+            HookRetryError: If every attempt raised an exception.
+        """
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                if attempt == self.max_attempts:
+                    raise HookRetryError(attempt, e) from e
+                delay = self.delay(attempt)
+                logger.warning(f"Attempt {attempt}/{self.max_attempts} failed: {e}. Retrying in {delay:.2f}s.")
+                time.sleep(delay)
@@ -4,17 +4,21 @@ from datetime import datetime
 import logging
 from typing import Dict, Any
 
+from .compression import open_text
+
 # Set up logging for this module
 logger = logging.getLogger(__name__)
 
 # The log file path, defaults to './state_transitions.jsonl'
 # Can be overridden by the STATE_LOG_PATH environment variable
+# A path ending in .gz or .zst is compressed; every record is appended as its own gzip member or zstd frame,
+# which compresses far less than a file written in one go (see ResultsWriter)
 LOG_PATH = os.environ.get("STATE_LOG_PATH", "./state_transitions.jsonl")
 
 def record_state_transition(state: Dict[str, Any]):
     """
     Appends a JSON record of the state transition to a log file.
-    Each call appends a new line, making it a JSON Lines (JSONL) file.
+    Each call appends a new line, making it a JSON Lines (JSONL) file, compressed if LOG_PATH ends in .gz or .zst.
 
     Args:
         state (Dict[str, Any]): A dictionary representing the state of a record
@@ -39,7 +43,7 @@ def record_state_transition(state: Dict[str, Any]):
     try:
         # Open in append mode ('a') with UTF-8 encoding
         # Using a context manager (with open(...)) ensures the file is properly closed
-        with open(LOG_PATH, "a", encoding='utf-8') as f:
+        with open_text(LOG_PATH, "a") as f:
             f.write(json.dumps(state_entry) + "\n")
         logger.debug(f"Recorded state transition for record: {list(state.keys())[0] if state else 'empty state'}")
     except IOError as e:
@@ -0,0 +1,32 @@
+"""
+Stub execution backend for load_test.py. Accepts the same arguments as batch_runner.py but,
+instead of running Docker batches, waits STUB_BATCH_DELAY seconds and writes one result per record,
+so the API's request handling can be measured on its own.
+"""
+import argparse
+import json
+import os
+import time
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stub batch runner that writes placeholder results.")
+    parser.add_argument("request_id", type=str)
+    parser.add_argument("batch_size", type=int)
+    parser.add_argument("dynamic_pipeline_path", type=str)
+    parser.add_argument("dataset_path", type=str)
+    parser.add_argument("script_dir", type=str)
+    args, _ = parser.parse_known_args() # Ignore batch_runner options such as --rerun-dead-letters
+
+    time.sleep(float(os.environ.get("STUB_BATCH_DELAY", "0.5")))
+
+    with open(args.dataset_path, "r", encoding='utf-8') as f:
+        dataset = json.load(f)
+
+    results_dir = os.path.join("requests", args.request_id, "results")
+    os.makedirs(results_dir, exist_ok=True)
+    # Write to a temporary name first so get_result never sees a partially written file
+    output_file = os.path.join(results_dir, "batch_0_transitions.jsonl")
+    with open(output_file + ".tmp", "w", encoding='utf-8') as f:
+        for record in dataset:
+            f.write(json.dumps({"raw": record, "final": record}) + "\n")
+    os.replace(output_file + ".tmp", output_file)
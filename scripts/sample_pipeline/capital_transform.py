@@ -4,7 +4,7 @@ import os
 #openai.api_key = os.getenv("OPENAI_API_KEY")
 #print("OPENAI_API_KEY inside container:", os.getenv("OPENAI_API_KEY"))
 
-def transform(record):
+def transform(record, context=None):
     statement = record.get("statement", "")
     if not statement:
         record["validation_result"] = "Missing statement"
@@ -13,7 +13,12 @@ def transform(record):
     prompt = f"Is the following statement factually correct? Answer 'yes' or 'no':\n\n{statement}"
 
     try:
-        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        if context is not None:
+            # Reuse one client (and its connection pool) for every record and respect the shared rate limit
+            client = context.client("openai", lambda: OpenAI(api_key=os.getenv("OPENAI_API_KEY")))
+            context.rate_limiter("openai").acquire()
+        else:
+            client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
         response = client.chat.completions.create(
             model="gpt-3.5-turbo",
@@ -0,0 +1,130 @@
+import gzip
+import json
+import os
+
+import pytest
+import pipeline.state_tracker
+from batch_runner import split_dataset, find_batch_files
+from pipeline.compression import open_text
+from pipeline.engine import run_pipeline
+from pipeline.loader import load_dataset
+from pipeline.results import ResultsWriter, iter_results
+
+
+@pytest.mark.parametrize("extension", [".gz", ".zst"])
+def test_open_text_round_trips_appended_members(tmp_path, extension):
+    if extension == ".zst":
+        pytest.importorskip("zstandard")
+    path = str(tmp_path / f"log.jsonl{extension}")
+    with open_text(path, "w") as f:
+        f.write("a\n")
+    with open_text(path, "a") as f:
+        f.write("b\n")
+
+    with open_text(path) as f:
+        assert f.read() == "a\nb\n"
+
+
+def test_engine_reads_and_writes_compressed_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline.state_tracker, "LOG_PATH", str(tmp_path / "state.jsonl"))
+    script_dir = tmp_path / "scripts"
+    script_dir.mkdir()
+    (script_dir / "flaky.py").write_text(
+        "def transform(record):\n    if record['id'] == 1:\n        raise RuntimeError('boom')\n    return record\n")
+    pipeline_path = tmp_path / "pipeline.json"
+    pipeline_path.write_text(json.dumps({"steps": [{"name": "flaky", "main_script": "flaky.py"}]}))
+    dataset_path = tmp_path / "dataset.json.gz"
+    with gzip.open(dataset_path, "wt") as f:
+        json.dump([{"id": i} for i in range(3)], f)
+    output_path = tmp_path / "results.jsonl.gz"
+
+    run_pipeline(str(pipeline_path), str(dataset_path), str(output_path), str(script_dir))
+
+    assert [r["raw"]["id"] for r in iter_results(str(output_path))] == [0, 1, 2]
+    with gzip.open(tmp_path / "results.dead_letter.jsonl.gz", "rt") as f:
+        assert json.loads(f.readline())["index"] == 1
+    assert not os.path.exists(f"{output_path}.partial")
+
+
+def test_compressed_results_appear_only_when_complete(tmp_path):
+    output_path = str(tmp_path / "results.jsonl.gz")
+    with ResultsWriter(output_path) as writer:
+        writer.write({"raw": {"id": 0}})
+        assert not os.path.exists(output_path)
+
+    assert list(iter_results(output_path)) == [{"raw": {"id": 0}}]
+
+
+def test_failed_run_leaves_compressed_results_partial(tmp_path):
+    output_path = str(tmp_path / "results.jsonl.gz")
+    with pytest.raises(RuntimeError):
+        with ResultsWriter(output_path) as writer:
+            writer.write({"raw": {"id": 0}})
+            raise RuntimeError("crash")
+
+    assert not os.path.exists(output_path)
+    with open_text(f"{output_path}.partial", compression="gzip") as f:
+        assert [json.loads(line) for line in f] == [{"raw": {"id": 0}}]
+
+
+def test_split_dataset_writes_compressed_batches(tmp_path):
+    dataset_path = tmp_path / "dataset.json"
+    dataset_path.write_text(json.dumps([{"id": i} for i in range(5)]))
+
+    batch_files = split_dataset(str(dataset_path), str(tmp_path / "batches"), 2, compression="gzip")
+
+    assert [os.path.basename(path) for path in batch_files] == ["batch_0.json.gz", "batch_1.json.gz", "batch_2.json.gz"]
+    assert find_batch_files(str(tmp_path / "batches")) == batch_files
+    assert load_dataset(batch_files[2]) == [{"id": 4}]
+
+
+@pytest.fixture
+def api_client(tmp_path, monkeypatch):
+    pytest.importorskip("fastapi")
+    from fastapi.testclient import TestClient
+    from api.main import app
+
+    monkeypatch.chdir(tmp_path)
+    results_dir = tmp_path / "requests" / "r1" / "results"
+    results_dir.mkdir(parents=True)
+    for batch in range(2):
+        with gzip.open(results_dir / f"batch_{batch}_transitions.jsonl.gz", "wt") as f:
+            f.write(json.dumps({"raw": {"id": batch}}) + "\n")
+    return TestClient(app)
+
+
+def test_get_result_reads_compressed_results(api_client):
+    response = api_client.get("/get_result/r1")
+
+    assert response.json()["results"] == [{"raw": {"id": 0}}, {"raw": {"id": 1}}]
+
+
+def test_get_result_orders_results_by_batch_number(api_client, tmp_path):
+    with gzip.open(tmp_path / "requests" / "r1" / "results" / "batch_10_transitions.jsonl.gz", "wt") as f:
+        f.write(json.dumps({"raw": {"id": 10}}) + "\n")
+
+    response = api_client.get("/get_result/r1")
+
+    assert [r["raw"]["id"] for r in response.json()["results"]] == [0, 1, 10]
+
+
+def test_get_result_sends_stored_gzip_of_single_batch_without_recompressing(api_client, tmp_path):
+    with api_client.stream("GET", "/get_result/r1?format=jsonl&batch=1", headers={"Accept-Encoding": "gzip"}) as response:
+        raw = b"".join(response.iter_raw())
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert raw == (tmp_path / "requests" / "r1" / "results" / "batch_1_transitions.jsonl.gz").read_bytes()
+
+
+def test_get_result_streams_several_batches_decompressed(api_client):
+    response = api_client.get("/get_result/r1?format=jsonl", headers={"Accept-Encoding": "gzip"})
+
+    assert "content-encoding" not in response.headers
+    assert response.text.splitlines() == ['{"raw": {"id": 0}}', '{"raw": {"id": 1}}']
+
+
+def test_get_result_decompresses_for_clients_without_gzip(api_client):
+    response = api_client.get("/get_result/r1?format=jsonl&batch=1", headers={"Accept-Encoding": "identity"})
+
+    assert "content-encoding" not in response.headers
+    assert response.text == '{"raw": {"id": 1}}\n'
@@ -0,0 +1,57 @@
+import pytest
+import pipeline.hooks
+from pipeline.executor import PipelineExecutor
+
+COUNTING_HOOK = """
+calls = []
+
+def transform(record):
+    calls.append(record["country"])
+    record["statement"] = f"The capital of {record['country']} is {record['capital']}."
+    return record
+"""
+
+
+def test_duplicates_run_once_and_fan_out_in_order(tmp_path):
+    (tmp_path / "statement.py").write_text(COUNTING_HOOK)
+    definition = {"dedup": {"ignore_fields": ["id"]}, "window_size": 2,
+                  "steps": [{"name": "statement", "main_script": "statement.py"}]}
+    dataset = [
+        {"id": "1", "country": "Italy", "capital": "Rome"},
+        {"id": "2", "country": "UK", "capital": "London"},
+        {"id": "3", "capital": "Rome", "country": "Italy"},
+        {"id": "4", "country": "Italy", "capital": "Rome"},
+    ]
+    executor = PipelineExecutor(definition, enable_state_log=False)
+
+    results = executor.execute(dataset, str(tmp_path))
+
+    module = pipeline.hooks._module_cache[str(tmp_path / "statement.py")]
+    assert module.calls == ["Italy", "UK"]
+    assert [r["raw"]["id"] for r in results] == ["1", "2", "3", "4"]
+    assert [r["main_statement"]["id"] for r in results] == ["1", "2", "3", "4"]
+    assert results[3]["main_statement"]["statement"] == "The capital of Italy is Rome."
+    assert executor.metrics["unique_records"] == 2
+    assert executor.metrics["dedup_ratio"] == 0.5
+
+
+def test_dedup_is_opt_in(tmp_path):
+    (tmp_path / "statement.py").write_text(COUNTING_HOOK)
+    executor = PipelineExecutor({"steps": [{"name": "statement", "main_script": "statement.py"}]}, enable_state_log=False)
+
+    executor.execute([{"country": "UK", "capital": "London"}] * 3, str(tmp_path))
+
+    assert executor.metrics["unique_records"] == 3
+    assert executor.metrics["dedup_ratio"] == 0.0
+
+
+def test_dedup_is_ignored_when_frame_steps_need_every_record(tmp_path):
+    pytest.importorskip("numpy")
+    (tmp_path / "mean.py").write_text("def transform_frame(cols):\n    cols['mean'] = cols['value'] * 0 + cols['value'].mean()\n    return cols\n")
+    definition = {"dedup": True, "steps": [{"name": "avg", "type": "frame", "frame_format": "numpy", "main_script": "mean.py"}]}
+    executor = PipelineExecutor(definition, enable_state_log=False)
+
+    results = executor.execute([{"value": 1}, {"value": 1}, {"value": 4}], str(tmp_path))
+
+    assert [r["main_avg"]["mean"] for r in results] == [2.0, 2.0, 2.0]
+    assert executor.metrics["unique_records"] == 3
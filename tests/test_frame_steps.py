@@ -0,0 +1,113 @@
+import pytest
+from pipeline.executor import PipelineExecutor
+
+
+def write_script(script_dir, name, body):
+    (script_dir / name).write_text(body)
+    return name
+
+
+def test_record_and_frame_steps_share_state_log(tmp_path):
+    pytest.importorskip("pandas")
+    write_script(tmp_path, "strip.py", "def transform(record):\n    record['text'] = record['text'].strip()\n    return record\n")
+    write_script(tmp_path, "score.py", "def transform_frame(df):\n    df['score'] = df['value'] * 2\n    return df\n")
+    pipeline_definition = {"steps": [
+        {"name": "clean", "main_script": "strip.py"},
+        {"name": "scoring", "type": "frame", "main_script": "score.py"},
+    ]}
+
+    dataset = [{"text": f"  row {i}  ", "value": i} for i in range(5)]
+    results = PipelineExecutor(pipeline_definition, enable_state_log=False).execute(dataset, str(tmp_path))
+
+    assert len(results) == 5
+    for i, r in enumerate(results):
+        assert r["main_clean"]["text"] == f"row {i}"
+        assert r["main_scoring"] == {"text": f"row {i}", "value": i, "score": i * 2}
+        assert isinstance(r["main_scoring"]["score"], int)
+
+
+def test_numpy_frame_step(tmp_path):
+    pytest.importorskip("numpy")
+    write_script(tmp_path, "norm.py", "def transform_frame(cols):\n    cols['norm'] = cols['value'] / cols['value'].max()\n    return cols\n")
+    pipeline_definition = {"steps": [{"name": "normalize", "type": "frame", "frame_format": "numpy", "main_script": "norm.py"}]}
+
+    results = PipelineExecutor(pipeline_definition, enable_state_log=False).execute([{"value": 1}, {"value": 4}], str(tmp_path))
+
+    assert [r["main_normalize"]["norm"] for r in results] == [0.25, 1.0]
+
+
+def test_invalid_step_type_is_rejected():
+    with pytest.raises(ValueError):
+        PipelineExecutor({"steps": [{"name": "bad", "type": "columnar", "main_script": "x.py"}]})
+
+
+def test_pandas_frame_step_keeps_values_and_keys_exact(tmp_path):
+    pytest.importorskip("pandas")
+    write_script(tmp_path, "flag.py", "def transform_frame(df):\n    df['flag'] = True\n    return df\n")
+    pipeline_definition = {"steps": [{"name": "flagging", "type": "frame", "main_script": "flag.py"}]}
+    dataset = [{"ratio": 0.12345678901234, "count": 3}, {"ratio": 1e-12}]
+
+    results = PipelineExecutor(pipeline_definition, enable_state_log=False).execute(dataset, str(tmp_path))
+
+    assert results[0]["main_flagging"] == {"ratio": 0.12345678901234, "count": 3, "flag": True}
+    assert results[1]["main_flagging"] == {"ratio": 1e-12, "flag": True}
+    assert isinstance(results[0]["main_flagging"]["count"], int)
+
+
+def test_pandas_frame_keeps_integers_exact_next_to_none(tmp_path):
+    pytest.importorskip("pandas")
+    write_script(tmp_path, "flag.py", "def transform_frame(df):\n    df['flag'] = True\n    return df\n")
+    pipeline_definition = {"steps": [{"name": "flagging", "type": "frame", "main_script": "flag.py"}]}
+    dataset = [{"a": 1, "big": 2**60 + 1}, {"a": None, "big": None}]
+
+    results = PipelineExecutor(pipeline_definition, enable_state_log=False).execute(dataset, str(tmp_path))
+
+    assert [r["main_flagging"]["a"] for r in results] == [1, None]
+    assert results[0]["main_flagging"]["big"] == 2**60 + 1
+    assert isinstance(results[0]["main_flagging"]["a"], int)
+
+
+def test_frame_hook_returning_wrong_row_count_dead_letters_the_batch(tmp_path):
+    pytest.importorskip("pandas")
+    write_script(tmp_path, "drop.py", "def transform_frame(df):\n    df['seen'] = True\n    return df.head(1)\n")
+    pipeline_definition = {"steps": [{"name": "dropping", "type": "frame", "main_script": "drop.py"}]}
+
+    results = PipelineExecutor(pipeline_definition, enable_state_log=False).execute([{"id": 1}, {"id": 2}], str(tmp_path))
+
+    assert all(r["dead_letter"]["error"].startswith("ValueError") for r in results)
+    assert all("main_dropping" not in r for r in results)
+
+
+def test_frame_step_sees_whole_batch_regardless_of_window_size(tmp_path):
+    pytest.importorskip("numpy")
+    write_script(tmp_path, "norm.py", "def transform_frame(cols):\n    cols['norm'] = cols['value'] / cols['value'].max()\n    return cols\n")
+    pipeline_definition = {"window_size": 2, "steps": [
+        {"name": "normalize", "type": "frame", "frame_format": "numpy", "main_script": "norm.py"}]}
+
+    results = PipelineExecutor(pipeline_definition, enable_state_log=False).execute(
+        [{"value": 1}, {"value": 2}, {"value": 4}], str(tmp_path))
+
+    assert [r["main_normalize"]["norm"] for r in results] == [0.25, 0.5, 1.0]
+
+
+def test_reordered_pandas_frame_is_matched_back_to_its_records(tmp_path):
+    pytest.importorskip("pandas")
+    write_script(tmp_path, "rank.py",
+                 "def transform_frame(df):\n    df = df.sort_values('value', ascending=False)\n"
+                 "    df['rank'] = range(1, len(df) + 1)\n    return df\n")
+    pipeline_definition = {"steps": [{"name": "ranking", "type": "frame", "main_script": "rank.py"}]}
+
+    results = PipelineExecutor(pipeline_definition, enable_state_log=False).execute(
+        [{"value": 1}, {"value": 3}, {"value": 2}], str(tmp_path))
+
+    assert [r["main_ranking"] for r in results] == [{"value": 1, "rank": 3}, {"value": 3, "rank": 1}, {"value": 2, "rank": 2}]
+
+
+def test_pandas_frame_with_new_index_is_rejected(tmp_path):
+    pytest.importorskip("pandas")
+    write_script(tmp_path, "reindex.py", "def transform_frame(df):\n    return df.set_index(df.index + 100)\n")
+    pipeline_definition = {"steps": [{"name": "reindexing", "type": "frame", "main_script": "reindex.py"}]}
+
+    results = PipelineExecutor(pipeline_definition, enable_state_log=False).execute([{"value": 1}], str(tmp_path))
+
+    assert results[0]["dead_letter"]["error"].startswith("ValueError")
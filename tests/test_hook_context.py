@@ -0,0 +1,100 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from pipeline.context import HookContext, RateLimiter
+from pipeline.executor import PipelineExecutor
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # Keep-alive, so pooled connections can be reused
+    client_ports = set()
+
+    def do_GET(self):
+        StubHandler.client_ports.add(self.client_address[1])
+        body = b'{"ok": true}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    StubHandler.client_ports = set()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def test_hooks_share_pooled_session_against_stub_server(tmp_path, stub_server):
+    pytest.importorskip("requests")
+    (tmp_path / "call.py").write_text(
+        "def transform(record, context):\n"
+        f"    response = context.http_session().get('{stub_server}/check')\n"
+        "    record['ok'] = response.json()['ok']\n"
+        "    return record\n"
+    )
+    executor = PipelineExecutor({"steps": [{"name": "call", "main_script": "call.py"}]}, enable_state_log=False)
+
+    results = executor.execute([{"id": i} for i in range(5)], str(tmp_path))
+    executor.close()
+
+    assert all(r["main_call"]["ok"] for r in results)
+    assert len(StubHandler.client_ports) == 1 # One connection reused for every record
+
+
+def test_hook_without_context_argument_still_works(tmp_path):
+    (tmp_path / "plain.py").write_text("def transform(record):\n    record['seen'] = True\n    return record\n")
+    executor = PipelineExecutor({"steps": [{"name": "plain", "main_script": "plain.py"}]}, enable_state_log=False)
+
+    results = executor.execute([{"id": 1}], str(tmp_path))
+
+    assert results[0]["main_plain"] == {"id": 1, "seen": True}
+
+
+def test_rate_limiter_throttles_after_burst():
+    limiter = RateLimiter(rate=50, capacity=2)
+    start = time.monotonic()
+    for _ in range(5):
+        limiter.acquire()
+    # Two tokens are available immediately, the remaining three refill at 50 per second
+    assert time.monotonic() - start >= 0.05
+
+
+def test_rate_limiter_rejects_cost_above_capacity():
+    limiter = RateLimiter(rate=10, capacity=2)
+
+    with pytest.raises(ValueError):
+        limiter.acquire(5)
+
+
+def test_map_batched_groups_similar_items_and_keeps_order():
+    calls = []
+
+    def call(batch):
+        calls.append(list(batch))
+        return [item.upper() for item in batch]
+
+    context = HookContext()
+    results = context.map_batched(call, ["a1", "b1", "a2", "a3", "b2"], batch_size=2, key=lambda item: item[0])
+
+    assert results == ["A1", "B1", "A2", "A3", "B2"]
+    assert calls == [["a1", "a2"], ["a3"], ["b1", "b2"]]
+
+
+def test_rate_limits_are_scaled_to_the_worker_share():
+    context = HookContext({"openai": {"rate": 10, "capacity": 4}}, rate_limit_share=0.25)
+
+    limiter = context.rate_limiter("openai")
+
+    assert (limiter.rate, limiter.capacity) == (2.5, 1.0)
+    with pytest.raises(ValueError):
+        HookContext(rate_limit_share=0)
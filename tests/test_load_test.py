@@ -0,0 +1,24 @@
+from load_test import percentile, summarize
+
+
+def test_percentile_uses_nearest_rank():
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 99) == 99.0
+    assert percentile([3.0], 95) == 3.0
+    assert percentile([], 50) is None
+
+
+def test_summarize_reports_error_rate_per_endpoint():
+    samples = [
+        {"endpoint": "/submit_pipeline", "latency": 0.010, "ok": True},
+        {"endpoint": "/submit_pipeline", "latency": 0.030, "ok": False},
+        {"endpoint": "/get_result", "latency": 0.005, "ok": True},
+    ]
+
+    summary = summarize(samples)
+
+    assert summary["/submit_pipeline"]["requests"] == 2
+    assert summary["/submit_pipeline"]["error_rate"] == 0.5
+    assert summary["/submit_pipeline"]["p99_ms"] == 30.0
+    assert summary["/get_result"]["errors"] == 0
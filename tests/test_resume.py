@@ -0,0 +1,106 @@
+import json
+
+import pytest
+import pipeline.hooks
+import pipeline.state_tracker
+from pipeline.engine import run_pipeline
+from pipeline.executor import PipelineExecutor
+from pipeline.results import iter_results
+from pipeline.resume import seed_state
+
+EXPENSIVE_HOOK = """
+import os
+
+def transform(record):
+    with open(os.path.join(os.path.dirname(__file__), "calls.log"), "a") as f:
+        f.write("call\\n")
+    if record["id"] == 2:
+        raise RuntimeError("upstream failure")
+    record["answer"] = record["id"] * 10
+    return record
+"""
+
+
+@pytest.fixture
+def pipeline_run(tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline.state_tracker, "LOG_PATH", str(tmp_path / "state.jsonl"))
+    # Each engine run is a fresh process in production; here a resumed run must not reuse the cached scripts
+    monkeypatch.setattr(pipeline.hooks, "_module_cache", {})
+    script_dir = tmp_path / "scripts"
+    script_dir.mkdir()
+    (script_dir / "expensive.py").write_text(EXPENSIVE_HOOK)
+    (script_dir / "label.py").write_text("def transform(record):\n    record['label'] = 'v1'\n    return record\n")
+    pipeline_path = tmp_path / "pipeline.json"
+    pipeline_path.write_text(json.dumps({"steps": [
+        {"name": "expensive", "main_script": "expensive.py"},
+        {"name": "label", "main_script": "label.py"},
+    ]}))
+    dataset_path = tmp_path / "dataset.json"
+    dataset_path.write_text(json.dumps([{"id": i} for i in range(4)]))
+    output_path = tmp_path / "results.jsonl"
+    args = (str(pipeline_path), str(dataset_path), str(output_path), str(script_dir))
+    run_pipeline(*args)
+    return args, script_dir, output_path
+
+
+def test_resume_runs_only_downstream_steps(pipeline_run):
+    args, script_dir, output_path = pipeline_run
+    (script_dir / "label.py").write_text("def transform(record):\n    record['label'] = 'v2'\n    return record\n")
+    pipeline.hooks._module_cache.clear()
+
+    run_pipeline(*args, resume_from="label")
+
+    results = [json.loads(line) for line in output_path.read_text().splitlines()]
+    assert len((script_dir / "calls.log").read_text().splitlines()) == 4 # Only the first run called the upstream hook
+    assert [r.get("main_label", {}).get("label") for r in results] == ["v2", "v2", None, "v2"]
+    assert results[3]["main_label"] == {"id": 3, "answer": 30, "label": "v2"}
+    assert results[2]["dead_letter"]["step"] == "expensive"
+
+
+def test_resume_rejects_changed_upstream_script(pipeline_run):
+    args, script_dir, _ = pipeline_run
+    (script_dir / "expensive.py").write_text(EXPENSIVE_HOOK + "\n# changed\n")
+
+    with pytest.raises(SystemExit):
+        run_pipeline(*args, resume_from="label")
+
+
+def test_resume_reads_previous_results_one_window_at_a_time(pipeline_run):
+    args, script_dir, output_path = pipeline_run
+    definition = {"window_size": 2, "steps": [
+        {"name": "expensive", "main_script": "expensive.py"},
+        {"name": "label", "main_script": "label.py"},
+    ]}
+    pulled = []
+
+    def previous_results():
+        for result in iter_results(str(output_path)):
+            pulled.append(result)
+            yield result
+
+    resumed = PipelineExecutor(definition, enable_state_log=False).iter_resume(previous_results(), str(script_dir), 1)
+
+    first = next(resumed)
+    assert len(pulled) == 2 # Only the first window was read
+    rest = list(resumed)
+    assert [r["raw"]["id"] for r in [first] + rest] == [0, 1, 2, 3]
+    assert "main_label" not in rest[1] # Dead-lettered upstream, kept as it was
+
+
+def test_seed_state_keeps_records_dead_lettered_outside_any_step():
+    definition = {"steps": [{"name": "expensive", "main_script": "expensive.py"}, {"name": "label", "main_script": "label.py"}]}
+    timed_out = {"raw": {"id": 7}, "dead_letter": {"step": None, "stage": None, "attempts": 0,
+                                                   "error": "BatchTimeoutError: Batch did not finish within 5s"}}
+
+    assert seed_state(timed_out, definition, 1) is None
+
+
+def test_dead_letter_rerun_with_changed_upstream_script_blocks_resume(pipeline_run):
+    args, script_dir, _ = pipeline_run
+    (script_dir / "expensive.py").write_text(EXPENSIVE_HOOK.replace('record["id"] == 2', 'record["id"] == -1'))
+    pipeline.hooks._module_cache.clear()
+
+    run_pipeline(*args, rerun_dead_letters=True)
+
+    with pytest.raises(SystemExit):
+        run_pipeline(*args, resume_from="label")
@@ -0,0 +1,103 @@
+import json
+
+import pytest
+import pipeline.state_tracker
+from pipeline.engine import run_pipeline
+from pipeline.executor import PipelineExecutor
+from pipeline.retry import RetryPolicy, HookRetryError
+
+FLAKY_HOOK = """
+attempts = {}
+
+def transform(record):
+    attempts[record["id"]] = attempts.get(record["id"], 0) + 1
+    if attempts[record["id"]] < 2:
+        raise ConnectionError("transient")
+    record["done"] = True
+    return record
+"""
+
+FLAG_HOOK = """
+import os
+
+def transform(record):
+    if os.path.exists(os.path.join(os.path.dirname(__file__), "fail_" + str(record["id"]))):
+        raise RuntimeError("broken record")
+    record["done"] = True
+    return record
+"""
+
+
+def test_retry_policy_recovers_transient_failures(tmp_path):
+    (tmp_path / "flaky.py").write_text(FLAKY_HOOK)
+    definition = {"steps": [{"name": "call", "main_script": "flaky.py", "retry": {"max_attempts": 3, "backoff_base": 0}}]}
+
+    results = PipelineExecutor(definition, enable_state_log=False).execute([{"id": 1}, {"id": 2}], str(tmp_path))
+
+    assert [r["main_call"]["done"] for r in results] == [True, True]
+    assert not any("dead_letter" in r for r in results)
+
+
+def test_exhausted_records_are_dead_lettered_and_skip_later_steps(tmp_path):
+    (tmp_path / "flag.py").write_text(FLAG_HOOK)
+    (tmp_path / "fail_2").write_text("")
+    definition = {"steps": [
+        {"name": "first", "main_script": "flag.py", "retry": {"max_attempts": 2, "backoff_base": 0}},
+        {"name": "second", "main_script": "flag.py"},
+    ]}
+
+    results = PipelineExecutor(definition, enable_state_log=False).execute([{"id": 1}, {"id": 2}], str(tmp_path))
+
+    assert "main_second" in results[0]
+    assert results[1]["dead_letter"] == {"step": "first", "stage": "main", "attempts": 2, "error": "RuntimeError: broken record"}
+    assert "main_first" not in results[1]
+
+
+def test_rerun_processes_only_dead_letters_and_merges_results(tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline.state_tracker, "LOG_PATH", str(tmp_path / "state.jsonl"))
+    script_dir = tmp_path / "scripts"
+    script_dir.mkdir()
+    (script_dir / "flag.py").write_text(FLAG_HOOK)
+    (script_dir / "fail_3").write_text("")
+    pipeline_path = tmp_path / "pipeline.json"
+    pipeline_path.write_text(json.dumps({"steps": [{"name": "step", "main_script": "flag.py"}]}))
+    dataset_path = tmp_path / "dataset.json"
+    dataset_path.write_text(json.dumps([{"id": i} for i in range(5)]))
+    output_path = tmp_path / "results.json"
+    dead_letter_path = tmp_path / "results.dead_letter.jsonl"
+
+    run_pipeline(str(pipeline_path), str(dataset_path), str(output_path), str(script_dir))
+    entries = [json.loads(line) for line in dead_letter_path.read_text().splitlines()]
+    assert [(e["index"], e["record"]) for e in entries] == [(3, {"id": 3})]
+
+    (script_dir / "fail_3").unlink()
+    run_pipeline(str(pipeline_path), str(dataset_path), str(output_path), str(script_dir), rerun_dead_letters=True)
+
+    results = json.loads(output_path.read_text())
+    assert [r["raw"]["id"] for r in results] == [0, 1, 2, 3, 4]
+    assert all(r["main_step"]["done"] for r in results)
+    assert not dead_letter_path.exists()
+
+
+def test_retry_policy_raises_after_max_attempts():
+    calls = []
+
+    def always_fails():
+        calls.append(1)
+        raise ValueError("nope")
+
+    with pytest.raises(HookRetryError) as excinfo:
+        RetryPolicy(max_attempts=3, backoff_base=0).call(always_fails)
+    assert excinfo.value.attempts == 3
+    assert len(calls) == 3
+
+
+def test_hook_returning_no_record_is_dead_lettered(tmp_path):
+    (tmp_path / "forgetful.py").write_text("def transform(record):\n    record['seen'] = True\n")
+    definition = {"steps": [{"name": "forgetful", "main_script": "forgetful.py"}]}
+
+    results = PipelineExecutor(definition, enable_state_log=False).execute([{"id": 1}], str(tmp_path))
+
+    assert results[0]["dead_letter"]["error"].startswith("ValueError: ")
+    assert results[0]["dead_letter"]["error"].endswith("did not return a dictionary (got NoneType).")
+    assert "main_forgetful" not in results[0]
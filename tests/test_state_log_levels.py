@@ -0,0 +1,59 @@
+import json
+
+import pytest
+import pipeline.state_tracker
+from pipeline.executor import PipelineExecutor
+
+HOOK = """
+def transform(record):
+    if record["id"] == 3:
+        raise ValueError("bad record")
+    record["count"] = record.get("count", 0) + 1
+    return record
+"""
+
+DEFINITION = {"steps": [{"name": "first", "pre_script": "hook.py", "main_script": "hook.py"}, {"name": "second", "main_script": "hook.py"}]}
+
+
+@pytest.fixture
+def state_log(tmp_path, monkeypatch):
+    path = tmp_path / "state.jsonl"
+    monkeypatch.setattr(pipeline.state_tracker, "LOG_PATH", str(path))
+    (tmp_path / "hook.py").write_text(HOOK)
+    return path
+
+
+def read_log(path):
+    return [json.loads(line) for line in path.read_text().splitlines()] if path.exists() else []
+
+
+def test_final_level_keeps_only_raw_and_final(tmp_path, state_log):
+    results = PipelineExecutor(DEFINITION, state_log_level="final").execute([{"id": 1}, {"id": 2}], str(tmp_path))
+
+    assert results[0] == {"raw": {"id": 1}, "final": {"id": 1, "count": 3}}
+    assert len(read_log(state_log)) == 2
+
+
+def test_errors_level_only_logs_dead_letters(tmp_path, state_log):
+    results = PipelineExecutor(DEFINITION, state_log_level="errors").execute([{"id": 1}, {"id": 3}], str(tmp_path))
+
+    assert results[0]["final"] == {"id": 1, "count": 3}
+    logged = read_log(state_log)
+    assert [entry["raw"]["id"] for entry in logged] == [3]
+    assert logged[0]["dead_letter"]["stage"] == "pre"
+
+
+def test_sampled_level_from_definition(tmp_path, state_log):
+    none_sampled = dict(DEFINITION, state_log={"level": "sampled", "sample_rate": 0})
+    all_sampled = dict(DEFINITION, state_log={"level": "sampled", "sample_rate": 100})
+
+    skipped = PipelineExecutor(none_sampled, enable_state_log=False).execute([{"id": 1}], str(tmp_path))
+    traced = PipelineExecutor(all_sampled, enable_state_log=False).execute([{"id": 1}], str(tmp_path))
+
+    assert set(skipped[0]) == {"raw", "final"}
+    assert set(traced[0]) == {"raw", "pre_first", "main_first", "main_second"}
+
+
+def test_invalid_state_log_level_is_rejected():
+    with pytest.raises(ValueError):
+        PipelineExecutor(DEFINITION, state_log_level="verbose")
@@ -0,0 +1,135 @@
+import json
+import os
+import sys
+import time
+
+import pytest
+import batch_runner
+from pipeline.executor import PipelineExecutor
+
+# Stands in for the engine container: writes one line naming the copy, after a delay chosen by the test
+FAKE_ENGINE = """
+import sys, time
+output_file, container_name, delay = sys.argv[1], sys.argv[2], float(sys.argv[3])
+time.sleep(delay)
+with open(output_file, "w") as f:
+    f.write(container_name + "\\n")
+"""
+
+
+def test_hook_timeout_dead_letters_only_the_slow_record(tmp_path):
+    (tmp_path / "slow.py").write_text(
+        "import time\n\ndef transform(record):\n    if record['id'] == 1:\n        time.sleep(2)\n"
+        "    record['done'] = True\n    return record\n")
+    executor = PipelineExecutor({"steps": [{"name": "slow", "main_script": "slow.py", "timeout": 0.2}]}, enable_state_log=False)
+
+    start = time.monotonic()
+    results = executor.execute([{"id": i} for i in range(3)], str(tmp_path))
+
+    assert time.monotonic() - start < 1.5
+    assert [r.get("main_slow", {}).get("done") for r in results] == [True, None, True]
+    assert results[1]["dead_letter"]["error"].startswith("HookTimeoutError")
+
+
+def test_invalid_hook_timeout_is_rejected():
+    with pytest.raises(ValueError):
+        PipelineExecutor({"steps": [{"name": "s", "main_script": "s.py", "timeout": -1}]}, enable_state_log=False)
+
+
+@pytest.fixture
+def fake_batches(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(batch_runner, "POLL_INTERVAL", 0.05)
+    monkeypatch.setattr(batch_runner, "kill_container", lambda name: None)
+    delays = {}
+
+    def build_batch_command(batch_file, output_file, *args, **kwargs):
+        container_name = args[2]
+        return [sys.executable, "-c", FAKE_ENGINE, output_file, container_name, str(delays.get(container_name, 0.1))]
+
+    monkeypatch.setattr(batch_runner, "build_batch_command", build_batch_command)
+    batch_files = batch_runner.split_dataset(_write_dataset(tmp_path), "requests/r1/batches", 1)
+    return batch_files, delays
+
+
+def _write_dataset(tmp_path):
+    path = tmp_path / "dataset.json"
+    path.write_text(json.dumps([{"id": i} for i in range(4)]))
+    return str(path)
+
+
+def test_speculative_copy_replaces_straggler(fake_batches):
+    batch_files, delays = fake_batches
+    delays["pipeline-r1-batch3-attempt0"] = 30 # Stuck first copy
+
+    start = time.monotonic()
+    outcomes = batch_runner.run_batches(batch_files, "pipeline.json", "scripts", "r1", "requests/r1/results",
+                                        speculative=True, speculative_factor=2.0)
+
+    assert time.monotonic() - start < 10
+    assert outcomes == {0: "completed", 1: "completed", 2: "completed", 3: "completed"}
+    with open("requests/r1/results/batch_3_transitions.jsonl") as f:
+        assert f.read().strip() == "pipeline-r1-batch3-attempt1"
+    assert not os.path.exists("requests/r1/attempts")
+
+
+def test_batch_timeout_stops_hung_batch(fake_batches):
+    batch_files, delays = fake_batches
+    delays["pipeline-r1-batch0-attempt0"] = 30
+
+    start = time.monotonic()
+    outcomes = batch_runner.run_batches(batch_files, "pipeline.json", "scripts", "r1", "requests/r1/results",
+                                        dead_letter_dir="requests/r1/dead_letters", batch_timeout=1)
+
+    assert time.monotonic() - start < 10
+    assert outcomes[0] == "timed_out"
+    assert [outcomes[i] for i in (1, 2, 3)] == ["completed"] * 3
+    with open("requests/r1/dead_letters/batch_0.jsonl") as f:
+        entry = json.loads(f.readline())
+    assert entry["index"] == 0 and entry["record"] == {"id": 0}
+    assert entry["error"].startswith("BatchTimeoutError")
+
+
+@pytest.mark.parametrize("compression", [None, "gzip"])
+def test_timed_out_batch_keeps_finished_records_and_dead_letters_the_rest(tmp_path, compression):
+    from pipeline.compression import open_text, with_compression
+    from pipeline.results import iter_results
+
+    batch_file = tmp_path / "batch_0.json"
+    batch_file.write_text(json.dumps([{"id": i} for i in range(3)]))
+    output_file = with_compression(str(tmp_path / "batch_0_transitions.jsonl"), compression)
+    # A killed engine: one complete line, one cut off mid-write
+    with open_text(f"{output_file}.partial" if compression else output_file, "w") as f:
+        f.write(json.dumps({"raw": {"id": 0}, "final": {"id": 0, "done": True}}) + "\n" + '{"raw": {"id"')
+    dead_letter_file = with_compression(str(tmp_path / "batch_0.dead_letters.jsonl"), compression)
+
+    unfinished = batch_runner.dead_letter_timed_out_batch(str(batch_file), output_file, dead_letter_file, 5)
+
+    results = list(iter_results(output_file))
+    assert unfinished == 2
+    assert results[0]["final"] == {"id": 0, "done": True}
+    assert [r["dead_letter"]["error"] for r in results[1:]] == ["BatchTimeoutError: Batch did not finish within 5s"] * 2
+    with open_text(dead_letter_file) as f:
+        assert [json.loads(line)["index"] for line in f] == [1, 2]
+    assert not os.path.exists(f"{output_file}.partial")
+
+
+def test_each_batch_container_gets_its_share_of_the_rate_limits(fake_batches, monkeypatch):
+    batch_files, _ = fake_batches
+    shares = []
+    fake_build = batch_runner.build_batch_command
+
+    def build_batch_command(*args, **kwargs):
+        shares.append(kwargs["rate_limit_share"])
+        return fake_build(*args, **kwargs)
+
+    monkeypatch.setattr(batch_runner, "build_batch_command", build_batch_command)
+    batch_runner.run_batches(batch_files, "pipeline.json", "scripts", "r1", "requests/r1/results")
+
+    assert shares == [0.25] * 4
+
+
+def test_batch_command_passes_rate_limit_share():
+    cmd = batch_runner.build_batch_command("b.json", "out.jsonl", "p.json", "scripts", "c", "", rate_limit_share=0.25)
+
+    assert "RATE_LIMIT_SHARE=0.25" in cmd
@@ -0,0 +1,51 @@
+import json
+
+import pytest
+import pipeline.state_tracker
+from pipeline.engine import run_pipeline
+from pipeline.executor import PipelineExecutor
+
+HOOK = "def transform(record):\n    record['double'] = record['id'] * 2\n    return record\n"
+
+
+@pytest.fixture
+def pipeline_files(tmp_path):
+    script_dir = tmp_path / "scripts"
+    script_dir.mkdir()
+    (script_dir / "double.py").write_text(HOOK)
+    pipeline_path = tmp_path / "pipeline.json"
+    pipeline_path.write_text(json.dumps({"window_size": 3, "steps": [{"name": "double", "main_script": "double.py"}]}))
+    dataset_path = tmp_path / "dataset.json"
+    dataset_path.write_text(json.dumps([{"id": i} for i in range(10)]))
+    return str(pipeline_path), str(dataset_path), str(script_dir)
+
+
+def test_iter_execute_yields_results_in_order_across_windows(pipeline_files):
+    pipeline_path, dataset_path, script_dir = pipeline_files
+    executor = PipelineExecutor(json.load(open(pipeline_path)), enable_state_log=False)
+
+    results = executor.iter_execute(json.load(open(dataset_path)), script_dir)
+
+    assert next(results)["main_double"] == {"id": 0, "double": 0}
+    assert [r["raw"]["id"] for r in results] == list(range(1, 10))
+
+
+@pytest.mark.parametrize("output_name", ["results.json", "results.jsonl"])
+def test_results_are_streamed_to_json_or_jsonl(tmp_path, monkeypatch, pipeline_files, output_name):
+    monkeypatch.setattr(pipeline.state_tracker, "LOG_PATH", str(tmp_path / "state.jsonl"))
+    output_path = tmp_path / output_name
+
+    run_pipeline(*pipeline_files[:2], str(output_path), pipeline_files[2])
+
+    text = output_path.read_text()
+    results = [json.loads(line) for line in text.splitlines()] if output_name.endswith(".jsonl") else json.loads(text)
+    assert [r["main_double"]["double"] for r in results] == [i * 2 for i in range(10)]
+
+
+def test_output_shared_with_state_log_is_written_once(tmp_path, monkeypatch, pipeline_files):
+    output_path = tmp_path / "batch_0_transitions.jsonl"
+    monkeypatch.setattr(pipeline.state_tracker, "LOG_PATH", str(output_path))
+
+    run_pipeline(*pipeline_files[:2], str(output_path), pipeline_files[2])
+
+    assert len(output_path.read_text().splitlines()) == 10